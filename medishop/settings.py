@@ -22,14 +22,35 @@ INSTALLED_APPS = [
 # Middleware
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'store.middleware.StaticAssetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'store.middleware.ReadYourWritesMiddleware',
+    'store.middleware.CartFlushMiddleware',
+    'store.middleware.RequestMetricsMiddleware',
 ]
 
+# Carts are kept in the cache and written to the database at checkout, on
+# login/logout, or once unsaved changes are older than this many seconds.
+CART_FLUSH_INTERVAL = 300
+
+# Seconds a signed-in shopper's cart lines hold stock (0 disables reservations).
+# Expired holds are released by `manage.py sweep_reservations` and on demand.
+STOCK_RESERVATION_TTL = 15 * 60
+
+# Delivered/cancelled orders older than this many days are moved out of the hot
+# order tables by `manage.py archive_orders` (and still listed under My Orders).
+ORDER_ARCHIVE_AFTER_DAYS = 180
+
+# Request metrics (/dashboard/metrics/): share of requests with SQL instrumentation,
+# and an optional bearer token for Prometheus scrapes of /dashboard/metrics/prometheus/
+METRICS_SAMPLE_RATE = 0.1
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 ROOT_URLCONF = 'medishop.urls'
 
 # Templates
@@ -44,6 +65,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'store.context_processors.cart_summary',
             ],
         },
     },
@@ -65,6 +87,31 @@ DATABASES = {
     }
 }
 
+# Read replicas: extra DATABASES aliases that catalog and reporting views
+# (@replica_reads) read from. Writes, transactions and sessions stay on
+# 'default'; a visitor who wrote, or any visitor right after a catalog change,
+# reads from 'default' for REPLICA_STICKY_SECONDS.
+DATABASE_ROUTERS = ['store.routers.PrimaryReplicaRouter']
+DATABASE_REPLICAS = []
+REPLICA_STICKY_SECONDS = 15
+
+# Cache (file-based so every web worker sees the same entries and invalidations)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    # Carts not yet written to the database (store.cart). Kept apart so culling
+    # the catalog cache never drops one, and never culled itself (culling lists
+    # the directory on every write). flush_carts writes stale carts and prunes
+    # expired ones.
+    'carts': {
+        'BACKEND': 'store.cache_backends.UnculledFileBasedCache',
+        'LOCATION': BASE_DIR / 'cache_carts',
+    },
+}
+
 # Password validators
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',},
@@ -82,6 +129,12 @@ USE_TZ = True
 # Static files
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+# collectstatic writes content-hashed copies (styles.3f2a1c.css) plus .gz/.br
+# siblings; StaticAssetMiddleware serves them with immutable caching.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'store.storage.CompressedManifestStaticFilesStorage'},
+}
 
 # Media files
 MEDIA_URL = '/media/'
@@ -0,0 +1,30 @@
+# Offline benchmark settings: throwaway SQLite database, in-process cache.
+# python manage.py bench --settings=medishop.settings_bench
+from .settings import *  # noqa: F401,F403
+
+DEBUG = False
+ALLOWED_HOSTS = ['testserver', 'localhost', '127.0.0.1']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'bench.sqlite3',
+        # IMMEDIATE transactions so parallel checkouts queue instead of failing lock upgrades.
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 30},
+        'TEST': {'NAME': BASE_DIR / 'bench_test.sqlite3'},
+    }
+}
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'OPTIONS': {'MAX_ENTRIES': 50000}},
+    'carts': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'carts', 'OPTIONS': {'MAX_ENTRIES': 10**6}},
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+MEDIA_ROOT = BASE_DIR / 'bench_media'
+
+# Build the throwaway schema straight from the models.
+MIGRATION_MODULES = {'store': None}
+
+# No collectstatic step here, so no manifest to resolve hashed names against.
+STORAGES = {**STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}}
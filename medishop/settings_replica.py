@@ -0,0 +1,23 @@
+# Local primary/replica setup on two SQLite files, for trying out read routing.
+# python manage.py migrate --settings=medishop.settings_replica
+# python manage.py sync_replica --settings=medishop.settings_replica   # "replicate" (re-run to catch up)
+# python manage.py runserver --settings=medishop.settings_replica
+from .settings import *  # noqa: F401,F403
+
+DEBUG = True
+ALLOWED_HOSTS = ['localhost', '127.0.0.1']
+
+DATABASES = {
+    'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'primary.sqlite3'},
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'replica.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+DATABASE_REPLICAS = ['replica']
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'carts': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'carts'},
+}
@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import Category, Medicine, Address, Cart, CartItem, Order, OrderItem, Prescription
+from .models import (
+    ArchivedOrder, Category, Medicine, Address, Cart, CartItem, Order, OrderItem, OrderStatusHistory, Prescription,
+    StockReservation,
+)
+from . import archive
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -9,7 +13,7 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Medicine)
 class MedicineAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'brand', 'price', 'stock', 'rx_required', 'category')
+    list_display = ('id', 'name', 'brand', 'price', 'stock', 'reserved', 'rx_required', 'category')
     list_filter = ('rx_required', 'category')
     search_fields = ('name', 'brand', 'description')
     prepopulated_fields = {'slug': ('name',)}
@@ -29,16 +33,42 @@ class CartAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'updated_at')
     inlines = [CartItemInline]
 
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'medicine', 'quantity', 'expires_at')
+    list_filter = ('expires_at',)
+    search_fields = ('user__username', 'medicine__name')
+    raw_id_fields = ('user', 'medicine')
+
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
 
+class OrderStatusHistoryInline(admin.TabularInline):
+    model = OrderStatusHistory
+    extra = 0
+    readonly_fields = ('from_status', 'to_status', 'changed_by', 'changed_at')
+    can_delete = False
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'total_amount', 'payment_status', 'order_status', 'created_at')
     list_filter = ('payment_status', 'order_status', 'created_at')
     search_fields = ('id', 'user__username')
-    inlines = [OrderItemInline]
+    inlines = [OrderItemInline, OrderStatusHistoryInline]
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'total_amount', 'order_status', 'created_at', 'archived_at')
+    list_filter = ('order_status', 'archived_at')
+    search_fields = ('id', 'user__username')
+    readonly_fields = [f.name for f in ArchivedOrder._meta.fields]
+    actions = ['restore']
+
+    @admin.action(description='Restore selected orders')
+    def restore(self, request, queryset):
+        moved = archive.restore_orders(queryset)
+        self.message_user(request, f"Restored {moved} order(s).")
 
 @admin.register(Prescription)
 class PrescriptionAdmin(admin.ModelAdmin):
@@ -0,0 +1,144 @@
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyMedicineSales, Medicine, Order, OrderItem, StatCounter
+
+# OrderItem sales are rolled up into DailyMedicineSales incrementally: the
+# highest order id already counted is kept as a StatCounter watermark, so each
+# run only reads orders placed since the last one. Orders cancelled after
+# being counted are taken back out by transition_orders (and by Order.save).
+# Archiving does not touch the summaries, so velocity survives it.
+
+SALES_WATERMARK = 'analytics:sales-order-id'
+ROLLUP_BATCH_SIZE = 1000
+# Order ids are handed out before commit, so a younger order can become
+# visible after an older one; the rollup stays this far behind the clock.
+SETTLE_SECONDS = 60
+REPORT_DAYS = 30
+REPORT_LIMIT = 20
+
+def _locked_watermark():
+    StatCounter.objects.bulk_create([StatCounter(name=SALES_WATERMARK)], ignore_conflicts=True)
+    return StatCounter.objects.select_for_update().get(name=SALES_WATERMARK)
+
+def _sales(order_ids):
+    line_total = ExpressionWrapper(F('quantity') * F('price'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    return (
+        OrderItem.objects.filter(order_id__in=order_ids, medicine__isnull=False)
+        .annotate(date=TruncDate('order__created_at'))
+        .values('date', 'medicine_id')
+        .annotate(units=Sum('quantity'), orders=Count('order_id', distinct=True), revenue=Sum(line_total))
+        .order_by()
+    )
+
+def _add(rows, sign=1):
+    rows = list(rows)
+    if not rows:
+        return
+    existing = {
+        (s.date, s.medicine_id): s
+        for s in DailyMedicineSales.objects.filter(
+            date__in={r['date'] for r in rows}, medicine_id__in={r['medicine_id'] for r in rows}
+        )
+    }
+    merged = []
+    for row in rows:
+        current = existing.get((row['date'], row['medicine_id'])) or DailyMedicineSales()
+        merged.append(DailyMedicineSales(
+            date=row['date'], medicine_id=row['medicine_id'],
+            units=current.units + sign * row['units'],
+            orders=current.orders + sign * row['orders'],
+            revenue=current.revenue + sign * row['revenue'],
+        ))
+    # MySQL upserts on any unique key and rejects an explicit target.
+    target = ['date', 'medicine'] if connection.features.supports_update_conflicts_with_target else None
+    DailyMedicineSales.objects.bulk_create(
+        merged, update_conflicts=True, unique_fields=target, update_fields=['units', 'orders', 'revenue'],
+        batch_size=ROLLUP_BATCH_SIZE,
+    )
+
+# ---------- Rollup ----------
+
+def rollup_sales(batch_size=ROLLUP_BATCH_SIZE, now=None):
+    """Fold orders placed since the last run into DailyMedicineSales; returns how many orders were read."""
+    cutoff = (now or timezone.now()) - timedelta(seconds=SETTLE_SECONDS)
+    done = 0
+    while True:
+        with transaction.atomic():
+            mark = _locked_watermark()
+            pending = Order.objects.filter(pk__gt=mark.value)
+            # Never move the watermark past an order that is still settling.
+            unsettled = pending.filter(created_at__gte=cutoff).aggregate(first=Min('pk'))['first']
+            if unsettled is not None:
+                pending = pending.filter(pk__lt=unsettled)
+            ids = list(pending.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return done
+            _add(_sales(ids).exclude(order__order_status='cancelled'))
+            mark.value = ids[-1]
+            mark.save(update_fields=['value'])
+        done += len(ids)
+        if len(ids) < batch_size:
+            return done
+
+def rebuild_sales(batch_size=ROLLUP_BATCH_SIZE):
+    """Drop the summaries and roll up every order still in the hot tables again."""
+    with transaction.atomic():
+        mark = _locked_watermark()
+        DailyMedicineSales.objects.all().delete()
+        mark.value = 0
+        mark.save(update_fields=['value'])
+    return rollup_sales(batch_size)
+
+def adjust_sales(order_ids, sign):
+    """Take already counted orders out of the summaries (``sign=-1``) or put them back (``sign=1``)."""
+    with transaction.atomic():
+        mark = _locked_watermark()
+        counted = [pk for pk in order_ids if pk <= mark.value]
+        if counted:
+            _add(_sales(counted), sign)
+
+# ---------- Report ----------
+
+def stock_report(days=REPORT_DAYS, limit=REPORT_LIMIT, today=None):
+    """Sales velocity, days of stock left, top sellers and slow movers over the last ``days`` days."""
+    since = (today or timezone.localdate()) - timedelta(days=days - 1)
+    window = DailyMedicineSales.objects.filter(date__gte=since)
+    rows = []
+    for row in (
+        window.values('medicine_id', 'medicine__name', 'medicine__slug', 'medicine__stock', 'medicine__reserved')
+        .annotate(units=Sum('units'), revenue=Sum('revenue'))
+        .filter(units__gt=0)
+        .order_by()
+    ):
+        available = max(row['medicine__stock'] - row['medicine__reserved'], 0)
+        velocity = row['units'] / days
+        rows.append({
+            'id': row['medicine_id'], 'name': row['medicine__name'], 'slug': row['medicine__slug'],
+            'available': available, 'units': row['units'], 'revenue': row['revenue'],
+            'velocity': round(velocity, 2), 'days_left': int(available / velocity),
+        })
+
+    slow = [
+        {'id': m.pk, 'name': m.name, 'slug': m.slug, 'available': m.available, 'units': 0, 'revenue': 0,
+         'velocity': 0, 'days_left': None}
+        for m in Medicine.objects.filter(stock__gt=F('reserved'))
+        .exclude(pk__in=window.filter(units__gt=0).values('medicine_id'))
+        .only('id', 'name', 'slug', 'stock', 'reserved')
+        .order_by('-stock', 'name')[:limit]
+    ]
+    if len(slow) < limit:
+        slow += sorted((r for r in rows if r['available']), key=lambda r: (r['units'], -r['available']))[:limit - len(slow)]
+
+    return {
+        'days': days,
+        'since': since,
+        'rolled_through': StatCounter.objects.filter(name=SALES_WATERMARK).values_list('value', flat=True).first() or 0,
+        'reorder': sorted(rows, key=lambda r: (r['days_left'], -r['velocity']))[:limit],
+        'top_sellers': sorted(rows, key=lambda r: -r['units'])[:limit],
+        'slow_movers': slow,
+    }
@@ -0,0 +1,114 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET
+
+from . import caching, facets, pagination, search
+from .models import Category, Medicine
+from .pagination import apaginate, page_size
+from .routers import replica_reads
+
+# Read-only JSON catalog for the storefront's scripts and partners. The views
+# are coroutines: under ASGI (medishop.asgi) each request waits on the
+# database without holding a worker thread, and the async middleware stack
+# adds no thread hops of its own. Responses carry no per-visitor data, so
+# they are cached under the catalog version and are public for CACHE_SECONDS.
+# Availability changes with every cart hold without a version bump, so it is
+# read fresh for the products returned.
+
+CACHE_SECONDS = 60
+PRODUCTS_PARAMS = ('category', *facets.PARAMS, 'after', 'per_page')
+LIST_FIELDS = ('id', 'name', 'slug', 'brand', 'category', 'price', 'stock', 'reserved', 'rx_required', 'created_at')
+
+def _medicine(medicine, detail=False):
+    data = {
+        'id': medicine.pk,
+        'name': medicine.name,
+        'slug': medicine.slug,
+        'brand': medicine.brand,
+        'category': medicine.category.slug if medicine.category_id else None,
+        'price': str(medicine.price),
+        'available': medicine.available,
+        'rx_required': medicine.rx_required,
+        'url': reverse('product_detail', args=[medicine.slug]),
+    }
+    if detail:
+        data['description'] = medicine.description
+        data['image'] = medicine.image.url if medicine.image else None
+    return data
+
+def _json(data, status=200):
+    response = JsonResponse(data, status=status)
+    if status == 200:
+        patch_cache_control(response, public=True, max_age=CACHE_SECONDS)
+    return response
+
+async def _fresh_availability(items):
+    stock = {pk: max(s - r, 0) async for pk, s, r in Medicine.objects.filter(
+        pk__in=[item['id'] for item in items]
+    ).values_list('pk', 'stock', 'reserved')}
+    for item in items:
+        item['available'] = stock.get(item['id'], 0)
+    return items
+
+def _listing():
+    return Medicine.objects.select_related('category').only(*LIST_FIELDS, 'category__slug')
+
+@require_GET
+@replica_reads
+async def products(request):
+    slug = request.GET.get('category')
+    selected = facets.parse(request.GET)
+
+    async def load():
+        medicines = facets.apply(_listing(), selected)
+        if slug:
+            category = await Category.objects.filter(slug=slug).afirst()
+            if category is None:
+                return None
+            medicines = medicines.filter(category=category)
+        page = await apaginate(request, medicines)
+        return {'results': [_medicine(m) for m in page], 'next': page.next_url}
+
+    if caching.known_params(request, PRODUCTS_PARAMS):
+        data = await caching.acached(
+            ('api-products', slug or '', facets.cache_key(selected), pagination.cache_key(request)), load
+        )
+    else:
+        data = await load()
+    if data is None:
+        return _json({'error': 'No such category.'}, status=404)
+    await _fresh_availability(data['results'])
+    return _json(data)
+
+@require_GET
+@replica_reads
+async def product(request, slug):
+    async def load():
+        medicine = await Medicine.objects.select_related('category').filter(slug=slug).afirst()
+        return _medicine(medicine, detail=True) if medicine else None
+
+    data = await caching.acached(('api-product', slug), load)
+    if data is None:
+        return _json({'error': 'No such product.'}, status=404)
+    await _fresh_availability([data])
+    return _json(data)
+
+@require_GET
+@replica_reads
+async def product_search(request):
+    q = request.GET.get('q', '')[:100].strip()
+    limit = page_size(request)
+
+    async def load():
+        # Ranking is several dependent queries; run them as one sync call rather than one hop each.
+        ranked = (await sync_to_async(search.ranked_ids)(q))[:limit]
+        found = await _listing().ain_bulk(ranked)
+        return {'q': q, 'results': [_medicine(found[pk]) for pk in ranked if pk in found]}
+
+    if not q:
+        return _json({'q': '', 'results': []})
+    data = await caching.acached(('api-search', q, limit), load)
+    await _fresh_availability(data['results'])
+    return _json(data)
@@ -0,0 +1,137 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ArchivedOrder, Medicine, Order, OrderItem, OrderStatusHistory, Prescription
+
+# Delivered and cancelled orders older than ORDER_ARCHIVE_AFTER_DAYS move to
+# ArchivedOrder, one compact row per order. Dashboard counters keep counting
+# them: rows leave the hot tables through raw DELETEs, which skip the
+# post_delete counter signals on purpose.
+
+TERMINAL_STATUSES = ('delivered', 'cancelled')
+BATCH_SIZE = 500
+
+def archive_after_days():
+    return getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 180)
+
+def archivable(days=None, now=None):
+    cutoff = (now or timezone.now()) - timedelta(days=archive_after_days() if days is None else days)
+    return Order.objects.filter(order_status__in=TERMINAL_STATUSES, created_at__lt=cutoff)
+
+def _raw_delete(model, column, ids):
+    table = connection.ops.quote_name(model._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE {connection.ops.quote_name(column)} IN ({placeholders})", ids)
+
+def _payloads(ids):
+    payloads = defaultdict(lambda: {'items': [], 'history': [], 'prescription': None})
+    items = OrderItem.objects.filter(order_id__in=ids).order_by('pk').values_list(
+        'order_id', 'medicine_id', 'medicine__name', 'quantity', 'price'
+    )
+    for order_id, medicine_id, name, quantity, price in items:
+        payloads[order_id]['items'].append([medicine_id, name, quantity, str(price)])
+    history = OrderStatusHistory.objects.filter(order_id__in=ids).order_by('pk').values_list(
+        'order_id', 'from_status', 'to_status', 'changed_by_id', 'changed_at'
+    )
+    for order_id, from_status, to_status, changed_by, changed_at in history:
+        payloads[order_id]['history'].append([from_status, to_status, changed_by, changed_at.isoformat()])
+    prescriptions = Prescription.objects.filter(order_id__in=ids).values_list('order_id', 'user_id', 'file', 'created_at')
+    for order_id, user_id, name, created_at in prescriptions:
+        payloads[order_id]['prescription'] = [user_id, name, created_at.isoformat()]
+    return payloads
+
+def archive_batch(orders, batch_size=BATCH_SIZE):
+    """Archive up to ``batch_size`` orders of ``orders`` in one transaction; returns how many moved."""
+    with transaction.atomic():
+        rows = list(orders.select_for_update().order_by('pk')[:batch_size])
+        if not rows:
+            return 0
+        ids = [o.pk for o in rows]
+        payloads = _payloads(ids)
+        ArchivedOrder.objects.bulk_create([
+            ArchivedOrder(
+                id=o.pk, user_id=o.user_id, address_id=o.address_id, total_amount=o.total_amount,
+                payment_status=o.payment_status, order_status=o.order_status, note=o.note,
+                created_at=o.created_at, updated_at=o.updated_at, payload=payloads[o.pk],
+            )
+            for o in rows
+        ])
+        for model, column in (
+            (OrderItem, 'order_id'), (OrderStatusHistory, 'order_id'), (Prescription, 'order_id'), (Order, 'id'),
+        ):
+            _raw_delete(model, column, ids)
+    return len(rows)
+
+def archive_orders(days=None, batch_size=BATCH_SIZE):
+    """Archive every eligible order, one short transaction per batch; returns the total moved."""
+    moved = 0
+    while True:
+        done = archive_batch(archivable(days), batch_size)
+        moved += done
+        if done < batch_size:
+            return moved
+
+def _restamp(model, stamps):
+    # bulk_create applies auto_now/auto_now_add, so put the original timestamps back afterwards.
+    if stamps:
+        model.objects.filter(pk__in=list(stamps)).update(
+            created_at=Case(*[When(pk=pk, then=Value(c)) for pk, (c, _) in stamps.items()], output_field=DateTimeField()),
+            updated_at=Case(*[When(pk=pk, then=Value(u)) for pk, (_, u) in stamps.items()], output_field=DateTimeField()),
+        )
+
+def restore_batch(archived, batch_size=BATCH_SIZE):
+    """Move up to ``batch_size`` archived orders back into the hot tables; returns how many moved."""
+    with transaction.atomic():
+        rows = list(archived.select_for_update().order_by('pk')[:batch_size])
+        if not rows:
+            return 0
+        Order.objects.bulk_create([
+            Order(
+                id=a.pk, user_id=a.user_id, address_id=a.address_id, total_amount=a.total_amount,
+                payment_status=a.payment_status, order_status=a.order_status, note=a.note,
+            )
+            for a in rows
+        ])
+        _restamp(Order, {a.pk: (a.created_at, a.updated_at) for a in rows})
+        # Medicines and staff users may have been deleted since; those references become NULL,
+        # as they would have on the hot rows.
+        items = [(a.pk, line) for a in rows for line in a.payload.get('items', [])]
+        history = [(a.pk, entry) for a in rows for entry in a.payload.get('history', [])]
+        medicines = set(Medicine.objects.filter(pk__in={m for _, (m, _, _, _) in items}).values_list('pk', flat=True))
+        users = set(User.objects.filter(pk__in={u for _, (_, _, u, _) in history}).values_list('pk', flat=True))
+        OrderItem.objects.bulk_create([
+            OrderItem(order_id=order_id, medicine_id=m if m in medicines else None, quantity=quantity, price=price)
+            for order_id, (m, _, quantity, price) in items
+        ])
+        OrderStatusHistory.objects.bulk_create([
+            OrderStatusHistory(
+                order_id=order_id, from_status=from_status, to_status=to_status,
+                changed_by_id=u if u in users else None, changed_at=parse_datetime(changed_at),
+            )
+            for order_id, (from_status, to_status, u, changed_at) in history
+        ])
+        prescriptions = {a.pk: a.payload['prescription'] for a in rows if a.payload.get('prescription')}
+        Prescription.objects.bulk_create([
+            Prescription(order_id=order_id, user_id=user_id, file=name) for order_id, (user_id, name, _) in prescriptions.items()
+        ])
+        if prescriptions:
+            created = Prescription.objects.filter(order_id__in=list(prescriptions)).values_list('pk', 'order_id')
+            _restamp(Prescription, {pk: (parse_datetime(prescriptions[order_id][2]),) * 2 for pk, order_id in created})
+        ArchivedOrder.objects.filter(pk__in=[a.pk for a in rows]).delete()
+    return len(rows)
+
+def restore_orders(archived, batch_size=BATCH_SIZE):
+    moved = 0
+    while True:
+        done = restore_batch(archived, batch_size)
+        moved += done
+        if done < batch_size:
+            return moved
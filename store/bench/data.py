@@ -0,0 +1,119 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from django.utils.text import slugify
+
+from store import analytics, counters, recommendations, search
+from store.caching import bump_catalog_version
+from store.models import Address, Cart, CartItem, Category, Medicine, Order, OrderItem
+
+BATCH_SIZE = 1000
+PASSWORD = 'bench-password'
+
+STEMS = [
+    'Paracet', 'Amoxi', 'Cetiri', 'Metfor', 'Ibupro', 'Azithro', 'Omepra', 'Pantopra', 'Atorva', 'Amlodi',
+    'Losar', 'Montelu', 'Levoceti', 'Cefix', 'Doxy', 'Diclofe', 'Ranit', 'Domperi', 'Ondanse', 'Glimepi',
+]
+SUFFIXES = ['amol', 'cillin', 'zine', 'min', 'fen', 'mycin', 'zole', 'statin', 'pine', 'tan', 'kast', 'xime']
+FORMS = ['Tablet', 'Capsule', 'Syrup', 'Suspension', 'Drops', 'Gel', 'Injection']
+STRENGTHS = ['5mg', '10mg', '20mg', '50mg', '100mg', '250mg', '500mg', '650mg', '1g']
+BRANDS = ['Acme', 'HealthPlus', 'NutriLife', 'Cipla', 'Sun Pharma', 'Mankind', 'Lupin', 'Zydus', 'Alkem', 'Torrent']
+CATEGORY_WORDS = [
+    'Pain Relief', 'Antibiotics', 'Vitamins', 'Cough & Cold', 'Diabetes Care', 'Cardiac', 'Digestive',
+    'Allergy', 'Skin Care', 'Eye Care', 'Bone Health', 'Women Care', 'Baby Care', 'First Aid', 'Ayurveda',
+]
+
+def _chunks(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _backdate(model, stamps):
+    # bulk_create applies auto_now_add, so spread timestamps afterwards with one CASE per chunk.
+    for chunk in _chunks(list(stamps.items()), 500):
+        model.objects.filter(pk__in=[pk for pk, _ in chunk]).update(
+            created_at=Case(*[When(pk=pk, then=Value(ts)) for pk, ts in chunk], output_field=DateTimeField())
+        )
+
+def generate(categories=15, medicines=2000, users=200, carts=100, orders=2000, lines=3, days=365, seed=42):
+    """Populate the current database with a reproducible synthetic shop."""
+    rng = random.Random(seed)
+    now = timezone.now()
+    with transaction.atomic():
+        names = [CATEGORY_WORDS[i % len(CATEGORY_WORDS)] + (f' {i // len(CATEGORY_WORDS) + 1}' if i >= len(CATEGORY_WORDS) else '')
+                 for i in range(categories)]
+        Category.objects.bulk_create([Category(name=n, slug=slugify(n)) for n in names], ignore_conflicts=True)
+        category_ids = list(Category.objects.filter(name__in=names).values_list('pk', flat=True))
+
+        rows = []
+        for i in range(medicines):
+            name = f"{rng.choice(STEMS)}{rng.choice(SUFFIXES)} {rng.choice(STRENGTHS)} {rng.choice(FORMS)}"
+            rows.append(Medicine(
+                name=name,
+                slug=f"{slugify(name)}-{seed}-{i}",
+                brand=rng.choice(BRANDS),
+                description=f"{name} by {rng.choice(BRANDS)}. Store below 25C. Keep out of reach of children.",
+                category_id=rng.choice(category_ids),
+                price=Decimal(rng.randint(500, 150000)) / 100,
+                stock=rng.randint(200, 5000),
+                rx_required=rng.random() < 0.3,
+            ))
+        Medicine.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+        catalog = list(Medicine.objects.values_list('pk', 'price'))
+        _backdate(Medicine, {pk: now - timedelta(days=rng.uniform(0, days)) for pk, _ in catalog})
+        search.index_queryset(Medicine.objects.all())
+
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            [User(username=f'shopper{i}', email=f'shopper{i}@example.com', password=password) for i in range(users)],
+            batch_size=BATCH_SIZE,
+        )
+        user_ids = list(User.objects.filter(username__startswith='shopper').values_list('pk', flat=True))
+        Address.objects.bulk_create(
+            [Address(user_id=u, line1=f'{u} MG Road', city='Pune', state='MH', pincode='411001', is_default=True)
+             for u in user_ids],
+            batch_size=BATCH_SIZE,
+        )
+        address_ids = dict(Address.objects.values_list('user_id', 'pk'))
+
+        Cart.objects.bulk_create([Cart(user_id=u) for u in user_ids[:carts]])
+        cart_items = []
+        for cart_id in Cart.objects.values_list('pk', flat=True):
+            for medicine_id, _ in rng.sample(catalog, min(lines, len(catalog))):
+                cart_items.append(CartItem(cart_id=cart_id, medicine_id=medicine_id, quantity=rng.randint(1, 3)))
+        CartItem.objects.bulk_create(cart_items, batch_size=BATCH_SIZE)
+
+        statuses = [value for value, _ in Order.ORDER_STATUS_CHOICES]
+        order_lines = []
+        new_orders = []
+        for _ in range(orders):
+            user_id = rng.choice(user_ids)
+            picked = rng.sample(catalog, min(rng.randint(1, lines * 2 - 1), len(catalog)))
+            quantities = [rng.randint(1, 4) for _ in picked]
+            total = sum((price * q for (_, price), q in zip(picked, quantities)), Decimal('0.00'))
+            new_orders.append(Order(
+                user_id=user_id, address_id=address_ids[user_id], total_amount=total,
+                payment_status='cod', order_status=rng.choice(statuses),
+            ))
+            order_lines.append(list(zip(picked, quantities)))
+        Order.objects.bulk_create(new_orders, batch_size=BATCH_SIZE)
+        order_ids = list(Order.objects.order_by('pk').values_list('pk', flat=True))[-orders:] if orders else []
+        OrderItem.objects.bulk_create(
+            [OrderItem(order_id=order_id, medicine_id=medicine_id, quantity=q, price=price)
+             for order_id, picked in zip(order_ids, order_lines) for (medicine_id, price), q in picked],
+            batch_size=BATCH_SIZE,
+        )
+        _backdate(Order, {pk: now - timedelta(days=rng.uniform(0, days)) for pk in order_ids})
+        counters.reconcile()
+        analytics.rollup_sales()
+        recommendations.record_baskets([medicine_id for (medicine_id, _), _ in picked] for picked in order_lines)
+        transaction.on_commit(bump_catalog_version)
+    return {
+        'categories': len(category_ids), 'medicines': len(catalog), 'users': len(user_ids),
+        'carts': carts, 'orders': len(order_ids),
+    }
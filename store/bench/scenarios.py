@@ -0,0 +1,203 @@
+import json
+import math
+import random
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from store.cart import CartStore
+from store.models import Address, Cart, CartItem, Category, Medicine, Order
+from store.orders import OutOfStock, place_order
+
+SEARCH_TERMS = ['paracetamol', 'amoxi', 'tablet 500mg', 'cipla syrup', 'vitamns', 'metformin', 'gel', 'zyd']
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+class Context:
+    """Clients and fixture ids shared by the scenarios of one run."""
+
+    def __init__(self, seed=7):
+        self.rng = random.Random(seed)
+        self.anonymous = Client()
+        self.shopper = User.objects.filter(username__startswith='shopper').order_by('pk').first()
+        self.shopper_client = Client()
+        self.shopper_client.force_login(self.shopper)
+        self.staff = User.objects.create_user('bench-staff', is_staff=True)
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+        self.medicines = list(Medicine.objects.values_list('pk', 'slug'))
+        self.categories = list(Category.objects.values_list('slug', flat=True))
+        self.address = Address.objects.filter(user=self.shopper).first()
+
+    def medicine(self):
+        return self.rng.choice(self.medicines)
+
+# ---------- Scenarios: each performs exactly one measured request ----------
+
+def browse_home(ctx):
+    return lambda: ctx.anonymous.get(reverse('home'))
+
+def browse_products(ctx):
+    return lambda: ctx.shopper_client.get(reverse('product_list'))
+
+def browse_category(ctx):
+    slug = ctx.rng.choice(ctx.categories)
+    return lambda: ctx.shopper_client.get(reverse('product_list_by_category', args=[slug]))
+
+def product_detail(ctx):
+    _, slug = ctx.medicine()
+    return lambda: ctx.shopper_client.get(reverse('product_detail', args=[slug]))
+
+def revalidate_product(ctx):
+    # A repeat view: the browser revalidates the page it already has.
+    _, slug = ctx.medicine()
+    url = reverse('product_detail', args=[slug])
+    etag = ctx.shopper_client.get(url).headers['ETag']
+    return lambda: ctx.shopper_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+def search(ctx):
+    term = ctx.rng.choice(SEARCH_TERMS)
+    return lambda: ctx.shopper_client.get(reverse('product_list'), {'q': term})
+
+def suggest(ctx):
+    term = ctx.rng.choice(SEARCH_TERMS)
+    return lambda: ctx.anonymous.get(reverse('search_suggest'), {'q': term[:ctx.rng.randint(1, len(term))]})
+
+def api_catalog(ctx):
+    # The async JSON endpoints, driven through the sync client (Django adapts the views).
+    _, slug = ctx.medicine()
+    url, params = ctx.rng.choice([
+        (reverse('api_products'), {'category': ctx.rng.choice(ctx.categories)}),
+        (reverse('api_product', args=[slug]), {}),
+        (reverse('api_search'), {'q': ctx.rng.choice(SEARCH_TERMS)}),
+    ])
+    return lambda: ctx.anonymous.get(url, params)
+
+def add_to_cart(ctx):
+    pk, _ = ctx.medicine()
+    return lambda: ctx.shopper_client.post(reverse('add_to_cart', args=[pk]))
+
+def view_cart(ctx):
+    return lambda: ctx.shopper_client.get(reverse('cart'))
+
+def cart_batch(ctx):
+    lines = [{'medicine': pk, 'quantity': ctx.rng.randint(0, 3)} for pk, _ in ctx.rng.sample(ctx.medicines, 4)]
+    return lambda: ctx.shopper_client.post(
+        reverse('cart_batch'), json.dumps({'lines': lines}), content_type='application/json'
+    )
+
+def checkout(ctx):
+    CartStore(user_id=ctx.shopper.pk).update({pk: 1 for pk, _ in ctx.rng.sample(ctx.medicines, 3)}, replace=True)
+    return lambda: ctx.shopper_client.post(reverse('checkout'), {'address_id': ctx.address.pk})
+
+def my_orders(ctx):
+    return lambda: ctx.shopper_client.get(reverse('my_orders'))
+
+def admin_dashboard(ctx):
+    return lambda: ctx.staff_client.get(reverse('admin_dashboard'))
+
+def stock_report(ctx):
+    return lambda: ctx.staff_client.get(reverse('admin_stock_report'), {'days': 90})
+
+def admin_orders(ctx):
+    return lambda: ctx.staff_client.get(reverse('admin_orders'))
+
+def admin_medicines(ctx):
+    return lambda: ctx.staff_client.get(reverse('admin_medicine_list'))
+
+SCENARIOS = {
+    'browse_home': browse_home,
+    'browse_products': browse_products,
+    'browse_category': browse_category,
+    'product_detail': product_detail,
+    'revalidate_product': revalidate_product,
+    'search': search,
+    'suggest': suggest,
+    'api_catalog': api_catalog,
+    'add_to_cart': add_to_cart,
+    'view_cart': view_cart,
+    'cart_batch': cart_batch,
+    'checkout': checkout,
+    'my_orders': my_orders,
+    'admin_dashboard': admin_dashboard,
+    'stock_report': stock_report,
+    'admin_orders': admin_orders,
+    'admin_medicines': admin_medicines,
+}
+
+def run_scenario(name, ctx, iterations=50, warmup=5):
+    prepare = SCENARIOS[name]
+    latencies, queries = [], []
+    for i in range(warmup + iterations):
+        request = prepare(ctx)
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = request()
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(f"{name}: HTTP {response.status_code}")
+        if i >= warmup:
+            latencies.append(elapsed * 1000)
+            queries.append(len(captured))
+    total = sum(latencies) / 1000
+    return {
+        'requests': iterations,
+        'max_queries': max(queries),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'rps': round(iterations / total, 1) if total else 0.0,
+    }
+
+# ---------- Concurrency: parallel checkouts must never oversell ----------
+
+def checkout_race(buyers=12, stock=5):
+    medicine = Medicine.objects.order_by('pk').first()
+    Medicine.objects.filter(pk=medicine.pk).update(stock=stock)
+    users = []
+    for i in range(buyers):
+        user = User.objects.create_user(f'racer{i}')
+        Address.objects.create(user=user, line1='1 Race St', city='Pune', state='MH', pincode='411001')
+        CartItem.objects.create(cart=Cart.objects.create(user=user), medicine=medicine, quantity=1)
+        users.append(user)
+
+    outcomes = []
+    barrier = threading.Barrier(buyers)
+
+    def buy(user):
+        try:
+            barrier.wait()
+            place_order(user, user.addresses.first())
+            outcomes.append('ok')
+        except OutOfStock:
+            outcomes.append('out_of_stock')
+        except Exception as exc:
+            outcomes.append(type(exc).__name__)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=buy, args=(u,)) for u in users]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    remaining = Medicine.objects.get(pk=medicine.pk).stock
+    sold = Order.objects.filter(user__in=users).count()
+    return {
+        'buyers': buyers,
+        'stock': stock,
+        'orders': sold,
+        'remaining': remaining,
+        'errors': len([o for o in outcomes if o not in ('ok', 'out_of_stock')]),
+        'oversold': sold > stock or remaining != stock - sold,
+    }
@@ -0,0 +1,177 @@
+import asyncio
+import io
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.urls import reverse
+
+from store.models import Category, Medicine
+
+from .scenarios import SEARCH_TERMS, percentile
+
+# Sync WSGI vs async ASGI on one dataset: the real Django handlers, driven
+# in-process so both see identical requests, data and cache. WSGI is served by
+# a fixed pool of worker threads taking requests in arrival order (a
+# gthread-style server); ASGI by one event
+# loop, every client in flight at once. ``send_delay`` is how long writing each
+# response to the client takes (slow networks): it holds a WSGI worker but
+# only parks an ASGI task.
+
+HOST = 'localhost'
+MIXES = ('api', 'html')
+
+def request_mix(kind, count, seed=42):
+    """``count`` GET paths (with query strings) for the ``api`` or ``html`` catalog endpoints."""
+    rng = random.Random(seed)
+    slugs = list(Medicine.objects.values_list('slug', flat=True))
+    categories = list(Category.objects.values_list('slug', flat=True))
+    paths = []
+    for _ in range(count):
+        roll = rng.random()
+        if kind == 'api':
+            if roll < 0.5:
+                paths.append(reverse('api_product', args=[rng.choice(slugs)]))
+            elif roll < 0.8:
+                query = {'category': rng.choice(categories)} if rng.random() < 0.7 else {}
+                query['per_page'] = rng.choice([12, 24, 48])
+                paths.append(f"{reverse('api_products')}?{urlencode(query)}")
+            else:
+                paths.append(f"{reverse('api_search')}?{urlencode({'q': rng.choice(SEARCH_TERMS)})}")
+        else:
+            if roll < 0.5:
+                paths.append(reverse('product_detail', args=[rng.choice(slugs)]))
+            elif roll < 0.8:
+                paths.append(reverse('product_list_by_category', args=[rng.choice(categories)]))
+            else:
+                paths.append(f"{reverse('product_list')}?{urlencode({'q': rng.choice(SEARCH_TERMS)})}")
+    return paths
+
+def _summary(server, latencies, errors, elapsed):
+    ms = [s * 1000 for s in latencies]
+    return {
+        'server': server,
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(ms, 50), 2),
+        'p95_ms': round(percentile(ms, 95), 2),
+        'p99_ms': round(percentile(ms, 99), 2),
+    }
+
+# ---------- WSGI ----------
+
+def _environ(path):
+    path_info, _, query = path.partition('?')
+    return {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path_info, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_HOST': HOST,
+        'REMOTE_ADDR': '127.0.0.1', 'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+
+def run_wsgi(paths, clients=64, workers=8, send_delay=0.0):
+    app = get_wsgi_application()
+    queue = iter(paths)
+    lock = threading.Lock()
+    latencies, errors = [], []
+
+    def serve(path):
+        status = []
+        try:
+            body = app(_environ(path), lambda s, headers, exc_info=None: status.append(s))
+            try:
+                for _ in body:
+                    pass
+                if send_delay:
+                    time.sleep(send_delay)
+            finally:
+                getattr(body, 'close', lambda: None)()
+        except Exception:
+            return False
+        return bool(status) and status[0].startswith('200')
+
+    def client(pool):
+        while True:
+            with lock:
+                path = next(queue, None)
+            if path is None:
+                return
+            started = time.perf_counter()
+            ok = pool.submit(serve, path).result()  # waiting for a free worker counts towards latency
+            with lock:
+                latencies.append(time.perf_counter() - started)
+                if not ok:
+                    errors.append(path)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        threads = [threading.Thread(target=client, args=(pool,)) for _ in range(clients)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+    return _summary('wsgi', latencies, len(errors), elapsed)
+
+# ---------- ASGI ----------
+
+def _scope(path):
+    path_info, _, query = path.partition('?')
+    return {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path_info, 'raw_path': path_info.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', HOST.encode())], 'server': (HOST, 80), 'client': ('127.0.0.1', 50000),
+    }
+
+async def _serve(paths, clients, send_delay):
+    app = get_asgi_application()
+    queue = iter(paths)
+    latencies, errors = [], []
+
+    async def request(path):
+        status = []
+        sent = asyncio.Event()
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await sent.wait()  # the handler listens for a disconnect until the response is out
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+            elif not message.get('more_body'):
+                if send_delay:
+                    await asyncio.sleep(send_delay)
+                sent.set()
+
+        started = time.perf_counter()
+        try:
+            await app(_scope(path), receive, send)
+        except Exception:
+            status.append(500)
+        latencies.append(time.perf_counter() - started)
+        if status != [200]:
+            errors.append(path)
+
+    async def client():
+        while (path := next(queue, None)) is not None:
+            await request(path)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return _summary('asgi', latencies, len(errors), time.perf_counter() - started)
+
+def run_asgi(paths, clients=64, send_delay=0.0):
+    return asyncio.run(_serve(paths, clients, send_delay))
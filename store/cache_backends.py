@@ -0,0 +1,45 @@
+import os
+import pickle
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+
+class UnculledFileBasedCache(FileBasedCache):
+    """FileBasedCache that never culls, so a write does not list the whole directory.
+
+    Entries only leave when they are deleted or read after expiring;
+    ``prune_expired()`` sweeps the rest (run it periodically, e.g. from flush_carts).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        self.directory = os.path.abspath(location)
+
+    def _cull(self):
+        pass
+
+    def prune_expired(self):
+        """Delete expired entries; returns how many were removed."""
+        now = time.time()
+        removed = 0
+        try:
+            entries = os.scandir(self.directory)
+        except FileNotFoundError:
+            return 0
+        with entries:
+            for entry in entries:
+                if not entry.name.endswith(self.cache_suffix):
+                    continue
+                try:
+                    with open(entry.path, 'rb') as f:
+                        expiry = pickle.load(f)  # every entry file starts with its expiry time
+                        if expiry is None or expiry >= now:
+                            continue
+                        # Leave an entry that was rewritten since it was opened.
+                        if os.stat(entry.path).st_ino != os.fstat(f.fileno()).st_ino:
+                            continue
+                    os.remove(entry.path)
+                    removed += 1
+                except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+                    pass
+        return removed
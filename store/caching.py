@@ -0,0 +1,109 @@
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+CATALOG_VERSION_KEY = 'catalog-version'
+CATALOG_CHANGED_KEY = 'catalog-changed-at'
+CATALOG_TIMEOUT = 60 * 60
+
+_MISSING = object()
+
+# ---------- Catalog version ----------
+
+def catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so a flushed cache never resurrects old entries.
+        cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+def bump_catalog_version():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, int(time.time() * 1000), None)
+    # Read replicas may still lag behind this change (see routers.pinned).
+    cache.set(CATALOG_CHANGED_KEY, time.time(), None)
+
+def catalog_key(*parts):
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f'catalog:{catalog_version()}:{digest}'
+
+def cached(parts, compute, timeout=CATALOG_TIMEOUT):
+    """Return ``compute()`` cached under the current catalog version."""
+    key = catalog_key(*parts) if isinstance(parts, tuple) else catalog_key(parts)
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
+
+# ---------- Async variants (async views) ----------
+
+def _lookup(parts):
+    key = catalog_key(*parts)
+    return key, cache.get(key, _MISSING)
+
+async def acached(parts, compute, timeout=CATALOG_TIMEOUT):
+    """``cached()`` for async views; ``compute`` is a coroutine function."""
+    # Version and value in one thread hop: the backends' async methods are sync_to_async wrappers.
+    key, value = await sync_to_async(_lookup)(parts if isinstance(parts, tuple) else (parts,))
+    if value is _MISSING:
+        value = await compute()
+        await cache.aset(key, value, timeout)
+    return value
+
+# ---------- Whole-page cache ----------
+
+def _page_cacheable(request):
+    # Anonymous visitors without a session or queued messages all see the same page.
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and 'messages' not in request.COOKIES
+    )
+
+def known_params(request, allowed):
+    # Any other query parameter would make a new cache entry per value (?x=1, ?x=2, ...).
+    return request.GET.keys() <= set(allowed)
+
+def no_params(request):
+    return () if not request.GET else None
+
+def cache_catalog_page(params=no_params):
+    """Cache anonymous pages keyed on the path plus ``params(request)``.
+
+    ``params`` returns the query parameters the view reads, normalized, or
+    None when the request has others; such requests are not cached.
+    """
+    def decorator(view):
+        return _cache_page(view, params)
+    return decorator
+
+def _cache_page(view, params):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        query = params(request) if _page_cacheable(request) else None
+        if query is None:
+            return view(request, *args, **kwargs)
+        key = catalog_key('page', request.path, query)
+        response = cache.get(key)
+        if response is not None:
+            return response
+        response = view(request, *args, **kwargs)
+        # Pages that handed out a CSRF token or set cookies are per-visitor.
+        if (
+            response.status_code == 200
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+            and not response.streaming
+        ):
+            cache.set(key, response, CATALOG_TIMEOUT)
+        return response
+    return wrapper
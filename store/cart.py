@@ -0,0 +1,229 @@
+import secrets
+import time
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import reservations
+from .caching import catalog_version
+from .models import Cart, CartItem, Medicine
+
+CART_TIMEOUT = 60 * 60 * 24 * 14
+MAX_QUANTITY = 999
+SESSION_TOKEN = 'cart_token'
+CART_CACHE = 'carts'
+FLUSH_BATCH_SIZE = 500
+
+CartSummary = namedtuple('CartSummary', 'item_count amount need_rx')
+EMPTY_SUMMARY = CartSummary(0, Decimal('0.00'), False)
+
+# ---------- Write-behind cart store ----------
+#
+# Active carts live in the CART_CACHE cache (its own alias, never culled to
+# make room for catalog pages); Cart/CartItem rows are written lazily at
+# checkout, on login/logout, by CartFlushMiddleware once changes are older
+# than CART_FLUSH_INTERVAL, and by flush_carts for carts whose owner does not
+# come back. Anonymous carts are keyed by a session token and merged into the
+# user's cart on login.
+
+def flush_interval():
+    return getattr(settings, 'CART_FLUSH_INTERVAL', 300)
+
+def _carts():
+    return caches[CART_CACHE]
+
+def _mark_dirty(user_id):
+    # One write per flush cycle (on the first unsaved change), so flush_carts can find the cart.
+    target = ['user'] if connection.features.supports_update_conflicts_with_target else None
+    Cart.objects.bulk_create(
+        [Cart(user_id=user_id, dirty_since=timezone.now())],
+        update_conflicts=True, unique_fields=target, update_fields=['dirty_since'],
+    )
+
+class CartStore:
+    def __init__(self, user_id=None, token=None):
+        self.user_id = user_id
+        self.key = f'cart:user:{user_id}' if user_id else f'cart:anon:{token}'
+        self._state = None
+
+    @classmethod
+    def for_request(cls, request, create=False):
+        store = getattr(request, '_cart_store', None)
+        if store is None:
+            if request.user.is_authenticated:
+                store = cls(user_id=request.user.pk)
+            else:
+                token = request.session.get(SESSION_TOKEN)
+                if token is None and create:
+                    token = request.session[SESSION_TOKEN] = secrets.token_urlsafe(16)
+                store = cls(token=token) if token else None
+            if store is not None:
+                request._cart_store = store
+        return store
+
+    @property
+    def state(self):
+        if self._state is None:
+            self._state = _carts().get(self.key)
+            if self._state is None:
+                self._state = {'lines': self._load() if self.user_id else {}, 'dirty_since': None, 'summary': None}
+                self._save()
+        return self._state
+
+    def _load(self):
+        return dict(CartItem.objects.filter(cart__user_id=self.user_id).values_list('medicine_id', 'quantity'))
+
+    def _save(self):
+        _carts().set(self.key, self._state, CART_TIMEOUT)
+
+    @property
+    def lines(self):
+        return dict(self.state['lines'])
+
+    @property
+    def dirty(self):
+        return self.state['dirty_since'] is not None
+
+    def update(self, quantities=None, deltas=None, replace=False):
+        """Apply several line changes at once; a quantity of 0 removes the line.
+
+        Returns the medicine ids whose change was refused for lack of stock.
+        """
+        lines = {} if replace else self.lines
+        for medicine_id, qty in (deltas or {}).items():
+            lines[medicine_id] = lines.get(medicine_id, 0) + qty
+        lines.update(quantities or {})
+        lines = {pk: min(qty, MAX_QUANTITY) for pk, qty in lines.items() if qty > 0}
+        old = self.state['lines']
+        unavailable = set()
+        if self.user_id and reservations.enabled() and lines != old:
+            changed = {pk: lines.get(pk, 0) for pk in set(lines) | set(old) if lines.get(pk, 0) != old.get(pk, 0)}
+            refused = reservations.hold(self.user_id, changed)
+            for pk, held in refused.items():
+                # Keep only what is still held: an expired hold may have been released meanwhile.
+                if held:
+                    lines[pk] = held
+                else:
+                    lines.pop(pk, None)
+            unavailable = set(refused)
+        if lines != old:
+            if self.user_id and self.state['dirty_since'] is None:
+                _mark_dirty(self.user_id)
+            self.state.update(lines=lines, summary=None, dirty_since=self.state['dirty_since'] or time.time())
+            self._save()
+        return unavailable
+
+    def add(self, medicine_id, quantity=1):
+        return self.update(deltas={medicine_id: quantity})
+
+    def set(self, medicine_id, quantity):
+        return self.update(quantities={medicine_id: quantity})
+
+    def remove(self, medicine_id):
+        return self.update(quantities={medicine_id: 0})
+
+    def clear(self):
+        """Forget every line without persisting (the rows are gone already, e.g. after checkout)."""
+        self._state = {'lines': {}, 'dirty_since': None, 'summary': None}
+        self._save()
+
+    def items(self):
+        """Unsaved CartItem instances with their medicines, in the order lines were added."""
+        medicines = Medicine.objects.in_bulk(list(self.state['lines']))
+        return [
+            CartItem(medicine=medicines[pk], quantity=qty)
+            for pk, qty in self.state['lines'].items() if pk in medicines
+        ]
+
+    def summary(self):
+        lines = self.state['lines']
+        if not lines:
+            return EMPTY_SUMMARY
+        version = catalog_version()
+        cached = self.state['summary']
+        if cached is None or cached[0] != version:
+            count, amount, need_rx = 0, Decimal('0.00'), False
+            for pk, price, rx in Medicine.objects.filter(pk__in=list(lines)).values_list('pk', 'price', 'rx_required'):
+                count += lines[pk]
+                amount += price * lines[pk]
+                need_rx = need_rx or rx
+            cached = self.state['summary'] = (version, CartSummary(count, amount.quantize(Decimal('0.01')), need_rx))
+            self._save()
+        return cached[1]
+
+    def flush(self):
+        """Write the cart to Cart/CartItem if it changed since the last flush."""
+        if not self.user_id or not self.dirty:
+            return False
+        lines = self.state['lines']
+        with transaction.atomic():
+            cart, _ = Cart.objects.get_or_create(user_id=self.user_id)
+            # Lines for medicines deleted since they were added are dropped here.
+            existing = set(Medicine.objects.filter(pk__in=list(lines)).values_list('pk', flat=True))
+            CartItem.objects.filter(cart=cart).exclude(medicine_id__in=existing).delete()
+            # MySQL upserts on any unique key and rejects an explicit target.
+            target = ['cart', 'medicine'] if connection.features.supports_update_conflicts_with_target else None
+            CartItem.objects.bulk_create(
+                [CartItem(cart=cart, medicine_id=pk, quantity=qty) for pk, qty in lines.items() if pk in existing],
+                update_conflicts=True, unique_fields=target, update_fields=['quantity', 'updated_at'],
+            )
+            # Another process may have changed the cart meanwhile; only a cart that still
+            # holds what was written becomes clean.
+            current = _carts().get(self.key)
+            if current is None or current['lines'] == lines:
+                Cart.objects.filter(pk=cart.pk).update(dirty_since=None)
+                self._state = current or self.state
+                self._state['dirty_since'] = None
+                self._save()
+            else:
+                self._state = current
+        return True
+
+    def flush_if_stale(self):
+        if self._state is not None and self.dirty and time.time() - self.state['dirty_since'] >= flush_interval():
+            return self.flush()
+        return False
+
+def flush_stale_carts(interval=None, batch_size=FLUSH_BATCH_SIZE):
+    """Write every cart whose unsaved changes are older than ``interval`` seconds; returns carts written."""
+    cutoff = timezone.now() - timedelta(seconds=flush_interval() if interval is None else interval)
+    written = 0
+    last = None
+    while True:
+        dirty = Cart.objects.filter(dirty_since__lte=cutoff).order_by('user_id')
+        if last is not None:
+            dirty = dirty.filter(user_id__gt=last)
+        user_ids = list(dirty.values_list('user_id', flat=True)[:batch_size])
+        if not user_ids:
+            return written
+        clean = []
+        for user_id in user_ids:
+            if CartStore(user_id=user_id).flush():
+                written += 1
+            else:
+                clean.append(user_id)  # already written, emptied by checkout, or expired
+        # A cart changed since the cutoff has a newer marker and keeps it.
+        Cart.objects.filter(user_id__in=clean, dirty_since__lte=cutoff).update(dirty_since=None)
+        last = user_ids[-1]
+
+def prune_expired_carts():
+    """Delete expired carts from a CART_CACHE that only drops them when they are read."""
+    prune = getattr(_carts(), 'prune_expired', None)
+    return prune() if prune is not None else 0
+
+def merge_anonymous_cart(request, user):
+    """Fold the anonymous cart of this session into ``user``'s cart (called on login)."""
+    token = request.session.pop(SESSION_TOKEN, None)
+    store = CartStore(user_id=user.pk)
+    request._cart_store = store
+    if token:
+        anonymous = CartStore(token=token)
+        if anonymous.lines:
+            store.update(deltas=anonymous.lines)
+            store.flush()
+        _carts().delete(anonymous.key)
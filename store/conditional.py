@@ -0,0 +1,89 @@
+import hashlib
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.utils.cache import patch_cache_control
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition
+
+from . import caching
+from .cart import CartStore
+from .models import Medicine, Order
+
+# ETag/Last-Modified validators for HTML pages, computed from cache lookups or a
+# single indexed column so a matching If-None-Match / If-Modified-Since gets a
+# 304 before the view loads anything or renders a template. Every page shows
+# the navbar (user, cart badge) and may carry a CSRF token, so validators are
+# always scoped to the viewer and responses are marked private.
+
+def _viewer(request):
+    user = request.user
+    store = CartStore.for_request(request)
+    items = sum(store.lines.values()) if store is not None else 0
+    return (
+        user.pk, user.get_username(), user.is_staff, items,
+        request.META.get('CSRF_COOKIE', ''),
+    )
+
+def _fresh(request):
+    # Queued flash messages are shown once, so such a response must be rendered.
+    return request.method in ('GET', 'HEAD') and not len(get_messages(request))
+
+def page_etag(request, *parts):
+    return hashlib.md5(repr((_viewer(request),) + parts).encode()).hexdigest()
+
+def catalog_etag(request, *args, **kwargs):
+    if not _fresh(request):
+        return None
+    # Catalog pages are built from data cached under the catalog version, so the
+    # version is exactly what decides whether the HTML would change.
+    return page_etag(request, caching.catalog_version(), request.get_full_path())
+
+def product_stock(request, slug):
+    """(stock, reserved) of the product, read fresh: holds change them without a catalog version bump."""
+    if not hasattr(request, '_product_stock'):
+        request._product_stock = Medicine.objects.filter(slug=slug).values_list('stock', 'reserved').first()
+    return request._product_stock
+
+def product_etag(request, slug):
+    if not _fresh(request):
+        return None
+    return page_etag(request, caching.catalog_version(), request.get_full_path(), product_stock(request, slug))
+
+def _order_updated_at(request, order_id):
+    if not hasattr(request, '_order_updated_at'):
+        request._order_updated_at = Order.objects.filter(
+            pk=order_id, user_id=request.user.pk
+        ).values_list('updated_at', flat=True).first()
+    return request._order_updated_at
+
+def order_etag(request, order_id):
+    updated_at = _order_updated_at(request, order_id)
+    if updated_at is None or not _fresh(request):
+        return None
+    return page_etag(request, order_id, updated_at.isoformat())
+
+def order_last_modified(request, order_id):
+    # Only meaningful alongside the viewer-scoped ETag, which clients send first.
+    return _order_updated_at(request, order_id) if _fresh(request) else None
+
+def conditional_page(etag_func=None, last_modified_func=None):
+    """``condition()`` for per-viewer HTML: 304s skip the view, and nothing is shared between users."""
+    def decorator(view):
+        conditional = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            if response.has_header('ETag') and request.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+                # The page just issued a CSRF cookie, which the next request will send.
+                etag = etag_func(request, *args, **kwargs)
+                if etag is None:
+                    del response.headers['ETag']
+                else:
+                    response.headers['ETag'] = quote_etag(etag)
+            if response.status_code in (200, 304):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
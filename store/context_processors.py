@@ -0,0 +1,10 @@
+from django.utils.functional import SimpleLazyObject
+
+from .cart import EMPTY_SUMMARY, CartStore
+
+def cart_summary(request):
+    # Lazy, so pages that never show the cart badge never touch the cache.
+    def summary():
+        store = CartStore.for_request(request)
+        return store.summary() if store is not None else EMPTY_SUMMARY
+    return {'cart_summary': SimpleLazyObject(summary)}
@@ -0,0 +1,93 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .analytics import SALES_WATERMARK
+from .models import ArchivedOrder, DailyOrderStat, Medicine, Order, StatCounter
+
+USERS = 'users'
+MEDICINES = 'medicines'
+ORDERS = 'orders'
+
+def status_counter(status):
+    return f'orders:{status}'
+
+# ---------- Incremental updates ----------
+
+def bump(name, delta=1):
+    if not delta:
+        return
+    if not StatCounter.objects.filter(name=name).update(value=F('value') + delta):
+        StatCounter.objects.bulk_create([StatCounter(name=name)], ignore_conflicts=True)
+        StatCounter.objects.filter(name=name).update(value=F('value') + delta)
+
+def bump_many(deltas):
+    for name, delta in deltas.items():
+        bump(name, delta)
+
+def record_orders(date, orders=0, revenue=Decimal('0')):
+    if not orders and not revenue:
+        return
+    changes = {'orders': F('orders') + orders, 'revenue': F('revenue') + revenue}
+    if not DailyOrderStat.objects.filter(date=date).update(**changes):
+        DailyOrderStat.objects.bulk_create([DailyOrderStat(date=date)], ignore_conflicts=True)
+        DailyOrderStat.objects.filter(date=date).update(**changes)
+
+def order_date(order):
+    return timezone.localdate(order.created_at)
+
+# ---------- Reads ----------
+
+def dashboard_stats():
+    values = dict(StatCounter.objects.values_list('name', 'value'))
+    return {
+        'users': values.get(USERS, 0),
+        'products': values.get(MEDICINES, 0),
+        'orders': values.get(ORDERS, 0),
+        'pending_orders': values.get(status_counter('placed'), 0),
+        'status_counts': [
+            (label, values.get(status_counter(value), 0)) for value, label in Order.ORDER_STATUS_CHOICES
+        ],
+    }
+
+def daily_revenue(days=14):
+    return DailyOrderStat.objects.order_by('-date')[:days]
+
+# ---------- Reconcile ----------
+
+def reconcile():
+    counts = {USERS: User.objects.count(), MEDICINES: Medicine.objects.count(), ORDERS: 0}
+    for value, _ in Order.ORDER_STATUS_CHOICES:
+        counts[status_counter(value)] = 0
+    # Archived orders still count: they are history, just stored elsewhere.
+    totals = defaultdict(lambda: [0, Decimal('0')])
+    for model in (Order, ArchivedOrder):
+        for row in model.objects.values('order_status').annotate(n=Count('pk')).order_by():
+            key = status_counter(row['order_status'])
+            counts[key] = counts.get(key, 0) + row['n']
+            counts[ORDERS] += row['n']
+        days = (
+            model.objects.annotate(date=TruncDate('created_at'))
+            .values('date')
+            .annotate(orders=Count('pk'), revenue=Sum('total_amount'))
+            .order_by()
+        )
+        for d in days:
+            totals[d['date']][0] += d['orders']
+            totals[d['date']][1] += d['revenue'] or 0
+
+    with transaction.atomic():
+        # The sales rollup keeps its watermark in the same table; it is not a counter.
+        StatCounter.objects.exclude(name=SALES_WATERMARK).delete()
+        StatCounter.objects.bulk_create([StatCounter(name=n, value=v) for n, v in counts.items()])
+        DailyOrderStat.objects.all().delete()
+        DailyOrderStat.objects.bulk_create(
+            [DailyOrderStat(date=date, orders=n, revenue=revenue) for date, (n, revenue) in totals.items()],
+            batch_size=1000,
+        )
+    return counts
@@ -0,0 +1,106 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import ArchivedOrder, OrderItem
+
+CHUNK_SIZE = 2000
+
+# Column name -> OrderItem lookup.
+COLUMNS = (
+    ('order_id', 'order_id'),
+    ('order_date', 'order__created_at'),
+    ('username', 'order__user__username'),
+    ('order_status', 'order__order_status'),
+    ('payment_status', 'order__payment_status'),
+    ('order_total', 'order__total_amount'),
+    ('line_id', 'pk'),
+    ('medicine', 'medicine__name'),
+    ('quantity', 'quantity'),
+    ('price', 'price'),
+    ('address_line1', 'order__address__line1'),
+    ('address_line2', 'order__address__line2'),
+    ('city', 'order__address__city'),
+    ('state', 'order__address__state'),
+    ('pincode', 'order__address__pincode'),
+    ('country', 'order__address__country'),
+)
+HEADER = [name for name, _ in COLUMNS]
+
+class Echo:
+    """File-like object whose write() hands the line straight back."""
+
+    def write(self, value):
+        return value
+
+def _filters(prefix, date_from, date_to, status):
+    filters = {}
+    if date_from:
+        filters[f'{prefix}created_at__gte'] = timezone.make_aware(datetime.combine(date_from, time.min))
+    if date_to:
+        filters[f'{prefix}created_at__lt'] = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+    if status:
+        filters[f'{prefix}order_status'] = status
+    return filters
+
+def order_lines(date_from=None, date_to=None, status=None):
+    return OrderItem.objects.filter(**_filters('order__', date_from, date_to, status))
+
+def archived_orders(date_from=None, date_to=None, status=None):
+    """Archived orders in the same range; their lines are exported from the archived payload."""
+    return ArchivedOrder.objects.filter(**_filters('', date_from, date_to, status))
+
+def iter_rows(lines, chunk_size=CHUNK_SIZE):
+    # Keyset chunks on the primary key: constant memory on every backend,
+    # including MySQL, whose driver buffers whole result sets for iterator().
+    lookups = [lookup for _, lookup in COLUMNS]
+    pk_index = lookups.index('pk')
+    last_pk = 0
+    while True:
+        chunk = list(lines.filter(pk__gt=last_pk).order_by('pk').values_list(*lookups)[:chunk_size])
+        if not chunk:
+            return
+        yield from chunk
+        last_pk = chunk[-1][pk_index]
+
+def iter_archived_rows(orders, chunk_size=CHUNK_SIZE):
+    # Archived lines keep no line id of their own; line_id is left empty.
+    last_pk = 0
+    while True:
+        chunk = list(
+            orders.filter(pk__gt=last_pk).select_related('user', 'address').order_by('pk')[:chunk_size]
+        )
+        if not chunk:
+            return
+        for order in chunk:
+            address = order.address
+            place = (
+                (address.line1, address.line2, address.city, address.state, address.pincode, address.country)
+                if address else (None,) * 6
+            )
+            head = (
+                order.pk, order.created_at, order.user.username, order.order_status,
+                order.payment_status, order.total_amount,
+            )
+            for _, name, quantity, price in order.payload.get('items', []):
+                yield head + (None, name, quantity, Decimal(price)) + place
+        last_pk = chunk[-1].pk
+
+def _rows(lines, archived):
+    yield from iter_rows(lines)
+    if archived is not None:
+        yield from iter_archived_rows(archived)
+
+def stream_csv(lines, archived=None):
+    writer = csv.writer(Echo())
+    yield writer.writerow(HEADER)
+    for row in _rows(lines, archived):
+        yield writer.writerow(row)
+
+def stream_ndjson(lines, archived=None):
+    for row in _rows(lines, archived):
+        yield json.dumps(dict(zip(HEADER, row)), cls=DjangoJSONEncoder) + '\n'
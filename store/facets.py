@@ -0,0 +1,98 @@
+from decimal import Decimal
+
+from django.db.models import Count, F, Q
+
+# (key, label, min inclusive, max exclusive)
+PRICE_BANDS = [
+    ('under-100', 'Under ₹100', None, Decimal('100')),
+    ('100-250', '₹100 – ₹250', Decimal('100'), Decimal('250')),
+    ('250-500', '₹250 – ₹500', Decimal('250'), Decimal('500')),
+    ('500-1000', '₹500 – ₹1000', Decimal('500'), Decimal('1000')),
+    ('1000-plus', '₹1000 and above', Decimal('1000'), None),
+]
+RX_CHOICES = [('no', 'No prescription'), ('yes', 'Prescription required')]
+BRAND_LIMIT = 15
+
+def _band_q(key):
+    for band_key, _, low, high in PRICE_BANDS:
+        if band_key == key:
+            q = Q()
+            if low is not None:
+                q &= Q(price__gte=low)
+            if high is not None:
+                q &= Q(price__lt=high)
+            return q
+    return None
+
+def parse(params):
+    bands = {key for key, _, _, _ in PRICE_BANDS}
+    return {
+        'brand': [b for b in params.getlist('brand') if b][:BRAND_LIMIT],
+        'price': [p for p in params.getlist('price') if p in bands],
+        'in_stock': params.get('in_stock') == '1',
+        'rx': params.get('rx') if params.get('rx') in dict(RX_CHOICES) else None,
+    }
+
+PARAMS = ('brand', 'price', 'in_stock', 'rx')
+
+def cache_key(selected):
+    """``parse()`` output as an order-insensitive cache key part."""
+    return tuple(sorted(selected['brand'])), tuple(sorted(selected['price'])), selected['in_stock'], selected['rx']
+
+def filter_q(selected, exclude=None):
+    """Q for every selected facet except ``exclude`` (counts ignore their own dimension)."""
+    q = Q()
+    if selected['brand'] and exclude != 'brand':
+        q &= Q(brand__in=selected['brand'])
+    if selected['price'] and exclude != 'price':
+        band = Q()
+        for key in selected['price']:
+            band |= _band_q(key)
+        q &= band
+    if selected['in_stock'] and exclude != 'in_stock':
+        q &= Q(stock__gt=F('reserved'))
+    if selected['rx'] and exclude != 'rx':
+        q &= Q(rx_required=selected['rx'] == 'yes')
+    return q
+
+def apply(queryset, selected):
+    return queryset.filter(filter_q(selected))
+
+def facet_counts(queryset, selected):
+    """All facet counts for ``queryset`` in four grouped queries, however many values each facet has."""
+    brands = (
+        queryset.filter(filter_q(selected, exclude='brand'))
+        .exclude(brand='')
+        .values('brand')
+        .annotate(count=Count('pk'))
+        .order_by('-count', 'brand')[:BRAND_LIMIT]
+    )
+    prices = queryset.filter(filter_q(selected, exclude='price')).aggregate(
+        **{key: Count('pk', filter=_band_q(key)) for key, _, _, _ in PRICE_BANDS}
+    )
+    stock = queryset.filter(filter_q(selected, exclude='in_stock')).aggregate(
+        in_stock=Count('pk', filter=Q(stock__gt=F('reserved')))
+    )
+    rx = queryset.filter(filter_q(selected, exclude='rx')).aggregate(
+        yes=Count('pk', filter=Q(rx_required=True)), no=Count('pk', filter=Q(rx_required=False))
+    )
+
+    brand_rows = [
+        {'value': row['brand'], 'label': row['brand'], 'count': row['count'], 'selected': row['brand'] in selected['brand']}
+        for row in brands
+    ]
+    # Keep selected brands visible even when they fall outside the top list.
+    shown = {row['value'] for row in brand_rows}
+    brand_rows += [{'value': b, 'label': b, 'count': None, 'selected': True} for b in selected['brand'] if b not in shown]
+    return {
+        'brand': brand_rows,
+        'price': [
+            {'value': key, 'label': label, 'count': prices[key], 'selected': key in selected['price']}
+            for key, label, _, _ in PRICE_BANDS
+        ],
+        'in_stock': {'count': stock['in_stock'], 'selected': selected['in_stock']},
+        'rx': [
+            {'value': value, 'label': label, 'count': rx[value], 'selected': selected['rx'] == value}
+            for value, label in RX_CHOICES
+        ],
+    }
@@ -1,7 +1,7 @@
 from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
-from .models import Address, Medicine, Prescription
+from .models import Address, Medicine, Order, Prescription
 
 class SignUpForm(UserCreationForm):
     email = forms.EmailField(required=True)
@@ -23,4 +23,19 @@ class MedicineForm(forms.ModelForm):
 class PrescriptionForm(forms.ModelForm):
     class Meta:
         model = Prescription
-        fields = ['file']
\ No newline at end of file
+        fields = ['file']
+
+class OrderExportForm(forms.Form):
+    FORMAT_CHOICES = [('csv', 'CSV'), ('ndjson', 'NDJSON')]
+
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    status = forms.ChoiceField(choices=[('', 'Any status')] + Order.ORDER_STATUS_CHOICES, required=False)
+    format = forms.ChoiceField(choices=FORMAT_CHOICES, required=False)
+
+class OrderBulkStatusForm(forms.Form):
+    SCOPE_CHOICES = [('selected', 'Selected orders'), ('filtered', 'All orders matching the filter')]
+
+    order_status = forms.ChoiceField(choices=Order.ORDER_STATUS_CHOICES)
+    scope = forms.ChoiceField(choices=SCOPE_CHOICES, initial='selected')
+    status_filter = forms.ChoiceField(choices=[('', 'Any status')] + Order.ORDER_STATUS_CHOICES, required=False)
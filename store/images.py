@@ -0,0 +1,94 @@
+import io
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .caching import bump_catalog_version
+from .models import Medicine
+
+logger = logging.getLogger(__name__)
+
+# Variant -> target width in pixels (cards render at ~220px, so 440 covers 2x screens).
+SIZES = {'thumb': 160, 'card': 440, 'detail': 900}
+FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+WORKERS = 2
+
+_executor = None
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='medicine-images')
+    return _executor
+
+def derivative_name(image_name, variant, ext):
+    folder, filename = posixpath.split(image_name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(folder, 'derived', f'{stem}-{variant}.{ext}')
+
+def _encode(image, fmt, options):
+    if fmt == 'JPEG' and image.mode != 'RGB':
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+def generate_derivatives(image_name, storage=default_storage):
+    with storage.open(image_name, 'rb') as fh:
+        source = ImageOps.exif_transpose(Image.open(fh))
+        source = source.convert('RGBA' if 'A' in source.getbands() or source.mode == 'P' else 'RGB')
+
+    variants = {}
+    for variant, width in SIZES.items():
+        image = source.copy()
+        if image.width > width:
+            image.thumbnail((width, round(width * image.height / image.width)), Image.LANCZOS)
+        entry = {'width': image.width, 'height': image.height}
+        for ext, fmt, options in FORMATS:
+            name = derivative_name(image_name, variant, ext)
+            if storage.exists(name):
+                storage.delete(name)
+            entry[ext] = storage.save(name, ContentFile(_encode(image, fmt, options)))
+        variants[variant] = entry
+    return variants
+
+def delete_derivatives(variants, storage=default_storage):
+    for entry in variants.values():
+        for ext, _, _ in FORMATS:
+            if entry.get(ext):
+                storage.delete(entry[ext])
+
+def build_for_medicine(medicine_id, stale=None):
+    close_old_connections()
+    try:
+        image_name = Medicine.objects.filter(pk=medicine_id).values_list('image', flat=True).first()
+        if stale:
+            delete_derivatives(stale)
+        variants = generate_derivatives(image_name) if image_name else {}
+        # Guard on the image name so a newer upload is never overwritten by a stale job.
+        updated = Medicine.objects.filter(pk=medicine_id, image=image_name).update(
+            image_variants=variants, updated_at=timezone.now()
+        )
+        if updated:
+            bump_catalog_version()
+        return variants
+    except Exception:
+        logger.exception("Could not build image derivatives for medicine %s", medicine_id)
+        return None
+    finally:
+        close_old_connections()
+
+def schedule(medicine_id, stale=None):
+    # Off the request path, and only once the new image row is committed.
+    transaction.on_commit(lambda: _pool().submit(build_for_medicine, medicine_id, stale))
@@ -0,0 +1,160 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+from . import counters, search
+from .caching import bump_catalog_version
+from .models import Category, Medicine
+
+BATCH_SIZE = 1000
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+# Input columns that map onto a Medicine field of the same name. An existing
+# product only has the columns present in its row overwritten.
+COLUMNS = ['name', 'brand', 'description', 'category', 'price', 'stock', 'rx_required']
+
+class RowError(ValueError):
+    pass
+
+# ---------- Readers ----------
+
+def read_csv(stream):
+    yield from csv.DictReader(stream)
+
+def read_jsonl(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+def read_json(stream):
+    # A JSON array cannot be parsed incrementally with the stdlib; prefer .jsonl for big files.
+    yield from json.load(stream)
+
+READERS = {'csv': read_csv, 'jsonl': read_jsonl, 'ndjson': read_jsonl, 'json': read_json}
+
+# ---------- Importer ----------
+
+class CatalogImporter:
+    def __init__(self, batch_size=BATCH_SIZE, index=True):
+        self.batch_size = batch_size
+        self.index = index
+        self.categories = {name.casefold(): pk for pk, name in Category.objects.values_list('pk', 'name')}
+        self.created = self.updated = self.duplicates = 0
+        self.errors = []
+        self._slugs = set()    # slugs assigned during this run
+        self._suffixes = {}    # name-derived slug -> last suffix handed out
+
+    def run(self, rows):
+        rows = enumerate(rows, start=1)
+        while batch := list(islice(rows, self.batch_size)):
+            self._import_batch(batch)
+        if self.created or self.updated:
+            transaction.on_commit(bump_catalog_version)
+
+    @property
+    def processed(self):
+        return self.created + self.updated
+
+    def _parse(self, row):
+        name = (row.get('name') or '').strip()
+        if not name:
+            raise RowError('missing name')
+        try:
+            price = Decimal(str(row.get('price', '')).strip())
+            stock = int(row.get('stock') or 0)
+        except (InvalidOperation, ValueError):
+            raise RowError('invalid price or stock')
+        if price < 0 or stock < 0:
+            raise RowError('negative price or stock')
+        fields = tuple(column for column in COLUMNS if column in row) + ('updated_at',)
+        return Medicine(
+            name=name[:200],
+            slug=self._slug(row, name),  # last, so rejected rows do not take a slug
+            brand=(row.get('brand') or '').strip()[:120],
+            description=row.get('description') or '',
+            price=price,
+            stock=stock,
+            rx_required=str(row.get('rx_required', '')).strip().casefold() in TRUE_VALUES,
+        ), (row.get('category') or '').strip(), fields
+
+    def _slug(self, row, name):
+        if row.get('slug'):
+            slug = slugify(row['slug'])[:220]
+            if not slug:
+                raise RowError(f"invalid slug {row['slug']!r}")
+            self._slugs.add(slug)
+            return slug
+        base = slugify(name)[:210]
+        if not base:
+            raise RowError(f'cannot build a slug from {name!r}')
+        # Same-named rows get base, base-2, base-3, ... in input order, so
+        # re-importing the same list updates the same products.
+        n = self._suffixes.get(base, 0)
+        while True:
+            n += 1
+            slug = base if n == 1 else f'{base}-{n}'
+            if slug not in self._slugs:
+                break
+        self._suffixes[base] = n
+        self._slugs.add(slug)
+        return slug
+
+    def _resolve_categories(self, names):
+        missing = {n.casefold(): n for n in names if n and n.casefold() not in self.categories}
+        if not missing:
+            return
+        Category.objects.bulk_create(
+            [Category(name=n[:100], slug=slugify(n)[:120]) for n in missing.values()], ignore_conflicts=True
+        )
+        slugs = {key: slugify(n)[:120] for key, n in missing.items()}
+        # A category may already exist under the same slug with a differently spelled name.
+        found = Category.objects.filter(
+            Q(name__in=[n[:100] for n in missing.values()]) | Q(slug__in=list(slugs.values()))
+        ).values_list('pk', 'name', 'slug')
+        by_name, by_slug = {}, {}
+        for pk, name, slug in found:
+            by_name[name.casefold()] = by_slug[slug] = pk
+        for key in missing:
+            pk = by_name.get(key[:100]) or by_slug.get(slugs[key])
+            if pk is not None:
+                self.categories[key] = pk
+
+    def _import_batch(self, batch):
+        parsed = {}
+        for line, row in batch:
+            try:
+                medicine, category, fields = self._parse(row)
+            except RowError as exc:
+                self.errors.append((line, str(exc)))
+                continue
+            if medicine.slug in parsed:
+                self.duplicates += 1  # later row with the same slug wins
+            parsed[medicine.slug] = (medicine, category, fields)
+        if not parsed:
+            return
+
+        self._resolve_categories({category for _, category, _ in parsed.values()})
+        groups = {}  # update fields -> medicines; one per batch for CSV
+        for medicine, category, fields in parsed.values():
+            medicine.category_id = self.categories.get(category.casefold()) if category else None
+            groups.setdefault(fields, []).append(medicine)
+
+        slugs = list(parsed)
+        with transaction.atomic():
+            existing = set(Medicine.objects.filter(slug__in=slugs).values_list('slug', flat=True))
+            # MySQL upserts on any unique key and rejects an explicit target.
+            target = ['slug'] if connection.features.supports_update_conflicts_with_target else None
+            for fields, medicines in groups.items():
+                Medicine.objects.bulk_create(
+                    medicines, update_conflicts=True, unique_fields=target, update_fields=list(fields)
+                )
+            created = len(slugs) - len(existing)
+            counters.bump(counters.MEDICINES, created)
+            if self.index:
+                search.index_queryset(Medicine.objects.filter(slug__in=slugs), batch_size=self.batch_size)
+        self.created += created
+        self.updated += len(existing)
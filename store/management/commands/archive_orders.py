@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from store import archive
+
+class Command(BaseCommand):
+    help = 'Move delivered and cancelled orders older than ORDER_ARCHIVE_AFTER_DAYS into the order archive.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Override ORDER_ARCHIVE_AFTER_DAYS.')
+        parser.add_argument('--batch-size', type=int, default=archive.BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the orders that would move.')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self.stdout.write(f"{archive.archivable(options['days']).count()} order(s) would be archived.")
+            return
+        moved = archive.archive_orders(options['days'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} order(s)."))
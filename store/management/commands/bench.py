@@ -0,0 +1,99 @@
+import json
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from store.bench import data, scenarios
+
+BUDGETS = Path(data.__file__).with_name('budgets.json')
+
+class Command(BaseCommand):
+    help = (
+        'Generate a synthetic shop in a throwaway test database, replay scripted scenarios through the '
+        'test client and fail if any exceeds its query or latency budget. '
+        'Runs offline with --settings=medishop.settings_bench.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*', help='Scenario names (default: all).')
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--medicines', type=int, default=2000)
+        parser.add_argument('--orders', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--categories', type=int, default=15)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--budgets', default=str(BUDGETS))
+        parser.add_argument('--skip-latency', action='store_true', help='Only enforce query budgets.')
+        parser.add_argument('--update-budgets', action='store_true', help='Write the measured results as the new budgets.')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file.')
+
+    def handle(self, *args, **options):
+        names = options['scenarios'] or list(scenarios.SCENARIOS)
+        unknown = set(names) - set(scenarios.SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            cache.clear()
+            sizes = data.generate(
+                categories=options['categories'], medicines=options['medicines'], users=options['users'],
+                carts=options['users'] // 2, orders=options['orders'], seed=options['seed'],
+            )
+            self.stdout.write('Dataset: ' + ', '.join(f'{k}={v}' for k, v in sizes.items()))
+            ctx = scenarios.Context(seed=options['seed'])
+            results = {name: scenarios.run_scenario(name, ctx, options['iterations']) for name in names}
+            race = scenarios.checkout_race()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self._report(results, race)
+        if options['json_path']:
+            Path(options['json_path']).write_text(json.dumps({'results': results, 'checkout_race': race}, indent=2))
+        if options['update_budgets']:
+            self._write_budgets(Path(options['budgets']), results)
+            return
+
+        failures = self._check(Path(options['budgets']), results, options['skip_latency'])
+        if race['oversold'] or race['errors']:
+            failures.append(f"checkout_race: {race}")
+        if failures:
+            raise CommandError('Budget exceeded:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('All scenarios within budget.'))
+
+    def _report(self, results, race):
+        self.stdout.write(f"{'scenario':<18}{'queries':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<18}{r['max_queries']:>8}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['rps']:>10}"
+            )
+        self.stdout.write(
+            f"checkout_race: {race['buyers']} buyers for {race['stock']} units -> {race['orders']} orders, "
+            f"{race['remaining']} left, {race['errors']} errors, oversold={race['oversold']}"
+        )
+
+    def _check(self, path, results, skip_latency):
+        budgets = json.loads(path.read_text()) if path.exists() else {}
+        failures = []
+        for name, r in results.items():
+            budget = budgets.get(name)
+            if budget is None:
+                continue
+            if r['max_queries'] > budget['max_queries']:
+                failures.append(f"{name}: {r['max_queries']} queries > {budget['max_queries']}")
+            if not skip_latency and r['p95_ms'] > budget['p95_ms']:
+                failures.append(f"{name}: p95 {r['p95_ms']}ms > {budget['p95_ms']}ms")
+        return failures
+
+    def _write_budgets(self, path, results):
+        # Queries are deterministic; latency gets generous headroom for slower machines.
+        budgets = json.loads(path.read_text()) if path.exists() else {}
+        for name, r in results.items():
+            budgets[name] = {'max_queries': r['max_queries'], 'p95_ms': round(max(r['p95_ms'] * 3, 25), 1)}
+        path.write_text(json.dumps(budgets, indent=2, sort_keys=True) + '\n')
+        self.stdout.write(self.style.SUCCESS(f"Budgets written to {path}."))
@@ -0,0 +1,76 @@
+import json
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from store.bench import data, servers
+
+class Command(BaseCommand):
+    help = (
+        'Compare throughput and latency of the sync WSGI and async ASGI handlers at high concurrency '
+        'on one synthetic shop in a throwaway test database. '
+        'Runs offline with --settings=medishop.settings_bench.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mix', nargs='+', choices=servers.MIXES, default=list(servers.MIXES),
+                            help='api: JSON catalog endpoints (async views); html: catalog pages (sync views).')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--clients', type=int, default=64, help='Concurrent clients.')
+        parser.add_argument('--workers', type=int, default=8, help='WSGI worker threads.')
+        parser.add_argument('--send-delay-ms', type=float, nargs='+', default=[0, 100],
+                            help='Time spent writing each response to a (slow) client.')
+        parser.add_argument('--medicines', type=int, default=2000)
+        parser.add_argument('--orders', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--categories', type=int, default=15)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file.')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        results = []
+        try:
+            sizes = data.generate(
+                categories=options['categories'], medicines=options['medicines'], users=options['users'],
+                carts=options['users'] // 2, orders=options['orders'], seed=options['seed'],
+            )
+            self.stdout.write('Dataset: ' + ', '.join(f'{k}={v}' for k, v in sizes.items()))
+            # Threads and the event loop open their own connections.
+            connection.close()
+            for mix in options['mix']:
+                paths = servers.request_mix(mix, options['requests'], seed=options['seed'])
+                connection.close()
+                # Warm both handlers (imports, templates, URL resolver) outside the measurements.
+                servers.run_wsgi(paths[:50], clients=4, workers=4)
+                servers.run_asgi(paths[:50], clients=4)
+                for delay_ms in options['send_delay_ms']:
+                    for server in ('wsgi', 'asgi'):
+                        cache.clear()  # both start cold and fill the cache in the same order
+                        if server == 'wsgi':
+                            r = servers.run_wsgi(paths, options['clients'], options['workers'], delay_ms / 1000)
+                        else:
+                            r = servers.run_asgi(paths, options['clients'], delay_ms / 1000)
+                        results.append({'mix': mix, 'send_delay_ms': delay_ms, **r})
+        finally:
+            connection.close()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(
+            f"{options['clients']} clients, {options['workers']} WSGI workers, {options['requests']} requests per run"
+        )
+        self.stdout.write(
+            f"{'mix':<6}{'delay ms':>9}{'server':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}"
+        )
+        for r in results:
+            self.stdout.write(
+                f"{r['mix']:<6}{r['send_delay_ms']:>9g}{r['server']:>8}{r['rps']:>10}"
+                f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['errors']:>8}"
+            )
+        if options['json_path']:
+            Path(options['json_path']).write_text(json.dumps({'results': results}, indent=2))
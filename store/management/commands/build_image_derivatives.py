@@ -0,0 +1,28 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from store import images
+from store.models import Medicine
+
+class Command(BaseCommand):
+    help = 'Generate resized WebP/JPEG derivatives for medicine images (backfill).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild images that already have derivatives.')
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        medicines = Medicine.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['force']:
+            medicines = medicines.filter(image_variants={})
+        ids = list(medicines.values_list('pk', flat=True))
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            results = list(pool.map(images.build_for_medicine, ids))
+        failed = sum(1 for r in results if r is None)
+        self.stdout.write(self.style.SUCCESS(
+            f"Built derivatives for {len(ids) - failed} images ({failed} failed) in {time.monotonic() - started:.2f}s."
+        ))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store import cart
+
+class Command(BaseCommand):
+    help = (
+        'Write cached carts with changes older than CART_FLUSH_INTERVAL to the database and prune '
+        'expired carts (once, or every N seconds with --every).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=int, default=0, help='Keep running, flushing every N seconds.')
+        parser.add_argument('--batch-size', type=int, default=cart.FLUSH_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        while True:
+            written = cart.flush_stale_carts(batch_size=options['batch_size'])
+            pruned = cart.prune_expired_carts()
+            self.stdout.write(f"Flushed {written} cart(s), pruned {pruned} expired cart(s).")
+            if not options['every']:
+                break
+            time.sleep(options['every'])
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from store.bench import data
+
+class Command(BaseCommand):
+    help = 'Fill the current database with a reproducible synthetic catalog, shoppers, carts and orders.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=15)
+        parser.add_argument('--medicines', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--carts', type=int, default=100)
+        parser.add_argument('--orders', type=int, default=2000)
+        parser.add_argument('--lines', type=int, default=3, help='Typical lines per cart/order.')
+        parser.add_argument('--days', type=int, default=365, help='Spread order dates over this many days.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        sizes = data.generate(**{k: options[k] for k in (
+            'categories', 'medicines', 'users', 'carts', 'orders', 'lines', 'days', 'seed'
+        )})
+        self.stdout.write(self.style.SUCCESS('Generated ' + ', '.join(f'{v} {k}' for k, v in sizes.items()) + '.'))
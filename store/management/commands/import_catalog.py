@@ -0,0 +1,54 @@
+import sys
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from store.importer import BATCH_SIZE, READERS, CatalogImporter
+
+class Command(BaseCommand):
+    help = (
+        'Upsert medicines from a CSV, JSON or JSON-lines price list, matched on slug. '
+        'Columns: name, price, and optionally slug, brand, description, category, stock, rx_required.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or '-' for stdin (requires --format).")
+        parser.add_argument('--format', choices=sorted(READERS), help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Run the whole import, then roll it back.')
+        parser.add_argument('--atomic', action='store_true', help='All-or-nothing instead of committing per batch.')
+        parser.add_argument('--no-index', action='store_true', help='Skip search indexing (run rebuild_search_index later).')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or Path(path).suffix.lstrip('.').lower()
+        if fmt not in READERS:
+            raise CommandError(f"Unknown format {fmt!r}; use --format ({', '.join(sorted(READERS))}).")
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        importer = CatalogImporter(batch_size=options['batch_size'], index=not options['no_index'])
+        started = time.monotonic()
+        try:
+            if options['dry_run'] or options['atomic']:
+                with transaction.atomic():
+                    importer.run(READERS[fmt](stream))
+                    transaction.set_rollback(options['dry_run'])
+            else:
+                importer.run(READERS[fmt](stream))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        elapsed = max(time.monotonic() - started, 1e-6)
+
+        for line, error in importer.errors[:20]:
+            self.stderr.write(f"row {line}: {error}")
+        if len(importer.errors) > 20:
+            self.stderr.write(f"... and {len(importer.errors) - 20} more errors")
+        prefix = '[dry run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{importer.created} created, {importer.updated} updated, "
+            f"{importer.duplicates} duplicate slugs, {len(importer.errors)} errors "
+            f"in {elapsed:.2f}s ({importer.processed / elapsed:,.0f} rows/s)."
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from store import recommendations
+
+class Command(BaseCommand):
+    help = 'Recount "frequently bought together" pairs from all orders and re-rank every medicine\'s neighbours.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=recommendations.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        read = recommendations.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt recommendations from {read} order(s)."))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store import search
+from store.models import SearchTerm
+
+class Command(BaseCommand):
+    help = 'Rebuild the medicine search index (postings and trigram vocabulary) from scratch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=search.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = search.rebuild(batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {count} medicines ({SearchTerm.objects.count()} terms) in {elapsed:.2f}s."
+        ))
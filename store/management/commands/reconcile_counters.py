@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from store import counters
+
+class Command(BaseCommand):
+    help = 'Recompute the dashboard counters and daily order stats from the source tables.'
+
+    def handle(self, *args, **options):
+        counts = counters.reconcile()
+        for name, value in sorted(counts.items()):
+            self.stdout.write(f"{name}: {value}")
+        self.stdout.write(self.style.SUCCESS('Counters reconciled.'))
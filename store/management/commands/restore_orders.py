@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store import archive
+from store.models import ArchivedOrder
+
+class Command(BaseCommand):
+    help = 'Move archived orders back into the hot order tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help='Archived order ids to restore.')
+        parser.add_argument('--user', help='Restore every archived order of this username.')
+        parser.add_argument('--batch-size', type=int, default=archive.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if not options['ids'] and not options['user']:
+            raise CommandError('Give order ids and/or --user.')
+        archived = ArchivedOrder.objects.all()
+        if options['ids']:
+            archived = archived.filter(pk__in=options['ids'])
+        if options['user']:
+            archived = archived.filter(user__username=options['user'])
+        moved = archive.restore_orders(archived, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Restored {moved} order(s)."))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store import analytics
+
+class Command(BaseCommand):
+    help = 'Roll new order lines up into daily per-medicine sales (once, or every N seconds with --every).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=int, default=0, help='Keep running, rolling up every N seconds.')
+        parser.add_argument('--batch-size', type=int, default=analytics.ROLLUP_BATCH_SIZE)
+        parser.add_argument('--rebuild', action='store_true', help='Drop the summaries and start from the first order.')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            done = analytics.rebuild_sales(options['batch_size'])
+            self.stdout.write(f"Rebuilt sales summaries from {done} order(s).")
+        while True:
+            done = analytics.rollup_sales(options['batch_size'])
+            self.stdout.write(f"Rolled up {done} new order(s).")
+            if not options['every']:
+                break
+            time.sleep(options['every'])
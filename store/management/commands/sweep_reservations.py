@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store import reservations
+
+class Command(BaseCommand):
+    help = 'Release expired stock reservations in batches (once, or every N seconds with --every).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=int, default=0, help='Keep running, sweeping every N seconds.')
+        parser.add_argument('--batch-size', type=int, default=reservations.SWEEP_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        while True:
+            released = reservations.release_expired(batch_size=options['batch_size'])
+            self.stdout.write(f"Released {released} expired reservation(s).")
+            if not options['every']:
+                break
+            time.sleep(options['every'])
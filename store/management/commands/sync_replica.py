@@ -0,0 +1,26 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from store import routers
+
+class Command(BaseCommand):
+    help = 'Copy the SQLite primary into the SQLite stand-in replicas (local testing of read routing only).'
+
+    def handle(self, *args, **options):
+        aliases = routers.replicas()
+        if not aliases:
+            raise CommandError('DATABASE_REPLICAS is empty.')
+        primary = connections[DEFAULT_DB_ALIAS]
+        if any(connections[a].vendor != 'sqlite' for a in [DEFAULT_DB_ALIAS, *aliases]):
+            raise CommandError('Only SQLite stand-ins can be synced; real replicas are fed by database replication.')
+        primary.ensure_connection()
+        for alias in aliases:
+            connections[alias].close()
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f"{alias}: copied from {DEFAULT_DB_ALIAS}.")
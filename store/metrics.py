@@ -0,0 +1,139 @@
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+# Per-process registry: each web worker reports its own numbers (labelled with its pid).
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float('inf'))
+N_PLUS_ONE_THRESHOLD = 5
+MAX_PATTERNS = 5
+
+_NUMBER_RE = re.compile(r'\b\d+(\.\d+)?\b')
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_IN_LIST_RE = re.compile(r'\bIN \((?:\s*(?:%s|\?|NULL)\s*,?)+\)', re.IGNORECASE)
+
+def normalize_sql(sql):
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    return _IN_LIST_RE.sub('IN (...)', sql)
+
+class QueryTracker:
+    """execute_wrapper that counts and times the SQL of one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            self.statements[normalize_sql(sql)] += 1
+
+    def repeated(self):
+        return [(sql, n) for sql, n in self.statements.most_common(MAX_PATTERNS) if n >= N_PLUS_ONE_THRESHOLD]
+
+class ViewStats:
+    def __init__(self):
+        self.requests = 0
+        self.seconds = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.sampled = 0
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.n_plus_one = 0
+        self.patterns = Counter()
+
+    def copy(self):
+        other = ViewStats()
+        other.__dict__.update(self.__dict__)
+        other.buckets = list(self.buckets)
+        other.patterns = Counter(self.patterns)
+        return other
+
+    def percentile(self, pct):
+        # Upper bound of the bucket holding the pct-th request.
+        target = self.requests * pct / 100
+        for bound, cumulative in zip(BUCKETS, self.buckets):
+            if cumulative >= target:
+                return bound
+        return BUCKETS[-1]
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = defaultdict(ViewStats)
+        self.started = time.time()
+
+    def record(self, view, seconds, tracker=None):
+        with self._lock:
+            stats = self._views[view]
+            stats.requests += 1
+            stats.seconds += seconds
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    stats.buckets[i] += 1
+            if tracker is not None:
+                stats.sampled += 1
+                stats.queries += tracker.count
+                stats.sql_seconds += tracker.seconds
+                repeated = tracker.repeated()
+                if repeated:
+                    stats.n_plus_one += 1
+                    for sql, n in repeated:
+                        stats.patterns[sql] = max(stats.patterns[sql], n)
+
+    def snapshot(self):
+        with self._lock:
+            return [(view, stats.copy()) for view, stats in sorted(self._views.items())]
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+            self.started = time.time()
+
+registry = Registry()
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def prometheus_text(rows=None):
+    rows = registry.snapshot() if rows is None else rows
+    pid = os.getpid()
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(samples)
+
+    def labels(view, **extra):
+        pairs = {'view': view, 'pid': str(pid), **extra}
+        return '{' + ','.join(f'{k}="{_label(v)}"' for k, v in pairs.items()) + '}'
+
+    metric('medishop_requests_total', 'counter', 'Requests handled, by view.',
+           [f'medishop_requests_total{labels(v)} {s.requests}' for v, s in rows])
+    histogram = []
+    for v, s in rows:
+        for bound, cumulative in zip(BUCKETS, s.buckets):
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            histogram.append(f'medishop_request_duration_seconds_bucket{labels(v, le=le)} {cumulative}')
+        histogram.append(f'medishop_request_duration_seconds_sum{labels(v)} {s.seconds:.6f}')
+        histogram.append(f'medishop_request_duration_seconds_count{labels(v)} {s.requests}')
+    metric('medishop_request_duration_seconds', 'histogram', 'Request latency, by view.', histogram)
+    metric('medishop_sampled_requests_total', 'counter', 'Requests with SQL instrumentation, by view.',
+           [f'medishop_sampled_requests_total{labels(v)} {s.sampled}' for v, s in rows])
+    metric('medishop_sql_queries_total', 'counter', 'SQL queries in sampled requests, by view.',
+           [f'medishop_sql_queries_total{labels(v)} {s.queries}' for v, s in rows])
+    metric('medishop_sql_seconds_total', 'counter', 'SQL time in sampled requests, by view.',
+           [f'medishop_sql_seconds_total{labels(v)} {s.sql_seconds:.6f}' for v, s in rows])
+    metric('medishop_n_plus_one_requests_total', 'counter', 'Sampled requests repeating one statement '
+           f'{N_PLUS_ONE_THRESHOLD}+ times, by view.',
+           [f'medishop_n_plus_one_requests_total{labels(v)} {s.n_plus_one}' for v, s in rows])
+    return '\n'.join(lines) + '\n'
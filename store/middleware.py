@@ -0,0 +1,206 @@
+import mimetypes
+import os
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import connections
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+
+from . import routers
+from .metrics import QueryTracker, registry
+
+class _DualModeMiddleware:
+    """Runs as a coroutine under ASGI when the rest of the stack is async, so it adds no thread hop."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.handle(request)
+
+class RequestMetricsMiddleware(_DualModeMiddleware):
+    """Record per-view latency for every request, and SQL counts for a sample of them."""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.sample_rate = getattr(settings, 'METRICS_SAMPLE_RATE', 0.1)
+
+    def _tracking(self, tracker):
+        stack = ExitStack()
+        if tracker is not None:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(tracker))
+        return stack
+
+    def _record(self, request, started, tracker):
+        match = request.resolver_match
+        registry.record(match.view_name if match else '<unresolved>', time.perf_counter() - started, tracker)
+
+    def handle(self, request):
+        tracker = QueryTracker() if random.random() < self.sample_rate else None
+        started = time.perf_counter()
+        with self._tracking(tracker):
+            response = self.get_response(request)
+        self._record(request, started, tracker)
+        return response
+
+    async def __acall__(self, request):
+        tracker = QueryTracker() if random.random() < self.sample_rate else None
+        started = time.perf_counter()
+        if tracker is None:
+            response = await self.get_response(request)
+        else:
+            # Async ORM calls run on the request's sync thread and its connections; hook those.
+            stack = await sync_to_async(self._tracking)(tracker)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        self._record(request, started, tracker)
+        return response
+
+class CartFlushMiddleware(_DualModeMiddleware):
+    """Persist a cart touched by this request once its unsaved changes are older than CART_FLUSH_INTERVAL."""
+
+    def handle(self, request):
+        response = self.get_response(request)
+        store = getattr(request, '_cart_store', None)
+        if store is not None:
+            store.flush_if_stale()
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        store = getattr(request, '_cart_store', None)
+        if store is not None:
+            await sync_to_async(store.flush_if_stale)()
+        return response
+
+class ReadYourWritesMiddleware(_DualModeMiddleware):
+    """Pin a visitor to the primary database for REPLICA_STICKY_SECONDS after a request that wrote to it."""
+
+    def handle(self, request):
+        token, state = routers.track_writes()
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.reset_writes(token)
+        return self._pin(request, response, state)
+
+    async def __acall__(self, request):
+        # Async ORM calls copy this context into their thread, so they share ``state``.
+        token, state = routers.track_writes()
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.reset_writes(token)
+        return self._pin(request, response, state)
+
+    def _pin(self, request, response, state):
+        if state['wrote'] and routers.replicas():
+            response.set_cookie(
+                routers.PIN_COOKIE, '1', max_age=routers.sticky_seconds(),
+                httponly=True, samesite='Lax', secure=request.is_secure(),
+            )
+        return response
+
+def _accepted(request):
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+class StaticAssetMiddleware(_DualModeMiddleware):
+    """Serve collected static files with precompressed variants and far-future caching.
+
+    Content-hashed names (from the staticfiles manifest) never change, so they
+    are sent as immutable for a year; anything else gets a short max-age.
+    Requests the middleware cannot answer fall through to the rest of the stack.
+    """
+
+    IMMUTABLE = 'public, max-age=31536000, immutable'
+    SHORT = 'public, max-age=300'
+    ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.prefix = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else '/' + settings.STATIC_URL
+        self.root = str(settings.STATIC_ROOT) if settings.STATIC_ROOT else None
+        self._hashed = None
+        self._variants = {}
+
+    def _static(self, request):
+        # Only stats local files, so it is run inline in async mode too.
+        if self.root and request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+            return self.serve(request, request.path_info[len(self.prefix):])
+        return None
+
+    def handle(self, request):
+        response = self._static(request)
+        return self.get_response(request) if response is None else response
+
+    async def __acall__(self, request):
+        response = self._static(request)
+        return await self.get_response(request) if response is None else response
+
+    def hashed_names(self):
+        if self._hashed is None:
+            self._hashed = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        return self._hashed
+
+    def variants(self, name):
+        # {encoding: path} for this file, looked up once per process. Keyed by the
+        # resolved path and only for files that exist, so arbitrary URLs add nothing.
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        found = self._variants.get(path)
+        if found is None and os.path.isfile(path):
+            found = {'identity': path}
+            for encoding, suffix in self.ENCODINGS:
+                if os.path.isfile(path + suffix):
+                    found[encoding] = path + suffix
+            self._variants[path] = found
+        return found
+
+    def serve(self, request, name):
+        variants = self.variants(name)
+        if variants is None:
+            return None
+        encoding = next((e for e, _ in self.ENCODINGS if e in variants and e in _accepted(request)), 'identity')
+        path = variants[encoding]
+        stat = os.stat(path)
+        etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}-{encoding}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=mimetypes.guess_type(name)[0] or 'application/octet-stream')
+            response.headers.pop('Content-Disposition', None)  # would name the .gz/.br file
+            response['Content-Length'] = stat.st_size
+            if encoding != 'identity':
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Cache-Control'] = self.IMMUTABLE if name in self.hashed_names() else self.SHORT
+        if len(variants) > 1:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
@@ -24,17 +24,65 @@ class Medicine(TimeStamped):
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='medicines')
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
+    # Units held by active StockReservations; maintained with conditional UPDATEs only.
+    reserved = models.PositiveIntegerField(default=0, editable=False)
     rx_required = models.BooleanField(default=False)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            # Facet filters: brand within a category, price bands, availability.
+            models.Index(fields=['category', 'brand']),
+            models.Index(fields=['brand']),
+            models.Index(fields=['price']),
+            models.Index(fields=['rx_required', 'stock']),
+            # Incremental refresh of the search suggestion index.
+            models.Index(fields=['updated_at']),
+        ]
 
     def __str__(self):
         return self.name
 
+    @property
+    def available(self):
+        return max(self.stock - self.reserved, 0)
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # Never write back a stale reservation count loaded with the instance.
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name != 'reserved'
+            ]
         super().save(*args, **kwargs)
 
+class SearchTerm(models.Model):
+    token = models.CharField(max_length=64, unique=True)
+
+    def __str__(self):
+        return self.token
+
+class SearchTrigram(models.Model):
+    trigram = models.CharField(max_length=3)
+    term = models.ForeignKey(SearchTerm, on_delete=models.CASCADE, related_name='trigrams')
+
+    class Meta:
+        unique_together = ('trigram', 'term')
+
+class SearchToken(models.Model):
+    token = models.CharField(max_length=64)
+    medicine = models.ForeignKey(Medicine, on_delete=models.CASCADE, related_name='search_tokens')
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        unique_together = ('token', 'medicine')
+
+    def __str__(self):
+        return f"{self.token} -> {self.medicine_id}"
+
 class Address(TimeStamped):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='addresses')
     line1 = models.CharField(max_length=255)
@@ -50,17 +98,25 @@ class Address(TimeStamped):
 
 class Cart(TimeStamped):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='cart')
+    # When the cached cart first had changes not yet written to CartItem; flush_carts picks these up.
+    dirty_since = models.DateTimeField(null=True, blank=True, db_index=True)
 
     def __str__(self):
         return f"Cart of {self.user.username}"
 
+    @property
+    def summary(self):
+        # The live cart, including changes not yet written to CartItem.
+        from .cart import CartStore
+        return CartStore(user_id=self.user_id).summary()
+
     @property
     def total_items(self):
-        return sum(item.quantity for item in self.items.all())
+        return self.summary.item_count
 
     @property
     def total_amount(self):
-        return sum(item.subtotal for item in self.items.select_related('medicine'))
+        return self.summary.amount
 
 class CartItem(TimeStamped):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
@@ -72,11 +128,24 @@ class CartItem(TimeStamped):
 
     @property
     def subtotal(self):
-        return float(self.medicine.price) * self.quantity
+        return self.medicine.price * self.quantity
 
     def __str__(self):
         return f"{self.medicine.name} (x{self.quantity})"
 
+class StockReservation(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='stock_reservations')
+    medicine = models.ForeignKey(Medicine, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'medicine')
+        indexes = [models.Index(fields=['expires_at'])]
+
+    def __str__(self):
+        return f"{self.medicine_id} x{self.quantity} for {self.user_id}"
+
 class Order(TimeStamped):
     PAYMENT_STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -92,6 +161,15 @@ class Order(TimeStamped):
         ('delivered', 'Delivered'),
         ('cancelled', 'Cancelled'),
     ]
+    # Allowed moves from each status; delivered and cancelled are final.
+    ORDER_STATUS_TRANSITIONS = {
+        'placed': ['confirmed', 'cancelled'],
+        'confirmed': ['packed', 'cancelled'],
+        'packed': ['shipped', 'cancelled'],
+        'shipped': ['delivered'],
+        'delivered': [],
+        'cancelled': [],
+    }
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
     address = models.ForeignKey(Address, on_delete=models.SET_NULL, null=True)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
@@ -99,9 +177,37 @@ class Order(TimeStamped):
     order_status = models.CharField(max_length=20, choices=ORDER_STATUS_CHOICES, default='placed')
     note = models.CharField(max_length=255, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['user', 'created_at', 'id']),
+        ]
+
     def __str__(self):
         return f"Order #{self.id} by {self.user.username}"
 
+    @classmethod
+    def sources_for(cls, status):
+        return [source for source, targets in cls.ORDER_STATUS_TRANSITIONS.items() if status in targets]
+
+    @property
+    def next_statuses(self):
+        labels = dict(self.ORDER_STATUS_CHOICES)
+        return [(value, labels[value]) for value in self.ORDER_STATUS_TRANSITIONS.get(self.order_status, [])]
+
+class OrderStatusHistory(models.Model):
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_history')
+    from_status = models.CharField(max_length=20)
+    to_status = models.CharField(max_length=20)
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    changed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=['order', 'changed_at'])]
+
+    def __str__(self):
+        return f"#{self.order_id}: {self.from_status} -> {self.to_status}"
+
 class OrderItem(TimeStamped):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     medicine = models.ForeignKey(Medicine, on_delete=models.SET_NULL, null=True)
@@ -117,4 +223,92 @@ class Prescription(TimeStamped):
     file = models.FileField(upload_to='prescriptions/')
 
     def __str__(self):
-        return f"Prescription #{self.id} - {self.user.username}"
\ No newline at end of file
+        return f"Prescription #{self.id} - {self.user.username}"
+
+class ArchivedOrder(models.Model):
+    """A delivered or cancelled order moved out of the hot tables; lines, history and prescription live in ``payload``."""
+    archived = True
+
+    id = models.BigIntegerField(primary_key=True)  # the original Order id
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_orders')
+    address = models.ForeignKey(Address, on_delete=models.SET_NULL, null=True, related_name='+')
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    payment_status = models.CharField(max_length=20, choices=Order.PAYMENT_STATUS_CHOICES)
+    order_status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES)
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    payload = models.JSONField(default=dict)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['user', 'created_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"Archived order #{self.id}"
+
+class StatCounter(models.Model):
+    name = models.CharField(max_length=64, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+class DailyOrderStat(models.Model):
+    date = models.DateField(unique=True)
+    orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.date}: {self.orders} orders"
+
+class DailyMedicineSales(models.Model):
+    """Units and revenue per medicine per day, rolled up from OrderItem by ``analytics.rollup_sales``."""
+    date = models.DateField()
+    medicine = models.ForeignKey(Medicine, on_delete=models.CASCADE, related_name='+')
+    units = models.IntegerField(default=0)
+    orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('date', 'medicine')
+
+    def __str__(self):
+        return f"{self.date}: {self.medicine_id} x{self.units}"
+
+class MedicinePair(models.Model):
+    """How many orders contained both medicines; kept in both directions, only for pairs seen together."""
+    medicine = models.ForeignKey(Medicine, on_delete=models.CASCADE, related_name='+')
+    other = models.ForeignKey(Medicine, on_delete=models.CASCADE, related_name='+')
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('medicine', 'other')
+
+    def __str__(self):
+        return f"{self.medicine_id} + {self.other_id}: {self.orders}"
+
+class MedicinePairStaging(models.Model):
+    """Scratch table recommendations.rebuild() recounts into before swapping it into MedicinePair."""
+    medicine_id = models.BigIntegerField()
+    other_id = models.BigIntegerField()
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('medicine_id', 'other_id')
+
+class Recommendation(models.Model):
+    """The top ``recommendations.TOP_K`` MedicinePair neighbours of a medicine, by rank."""
+    medicine = models.ForeignKey(Medicine, on_delete=models.CASCADE, related_name='recommendations')
+    other = models.ForeignKey(Medicine, on_delete=models.CASCADE, related_name='recommended_with')
+    rank = models.PositiveSmallIntegerField()
+    orders = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('medicine', 'rank')
+
+    def __str__(self):
+        return f"{self.medicine_id} #{self.rank}: {self.other_id}"
@@ -0,0 +1,130 @@
+from collections import Counter
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, When
+from django.utils import timezone
+
+from . import analytics, counters, recommendations, reservations
+from .caching import bump_catalog_version
+from .models import CartItem, Medicine, Order, OrderItem, OrderStatusHistory, StockReservation
+
+class CheckoutError(Exception):
+    pass
+
+class EmptyCart(CheckoutError):
+    pass
+
+class TransitionError(Exception):
+    pass
+
+class OutOfStock(CheckoutError):
+    def __init__(self, medicines):
+        self.medicines = medicines
+        names = ', '.join(m.name for m in medicines) or 'some items'
+        super().__init__(f"Not enough stock for {names}.")
+
+def place_order(user, address, prescription=None, quantities=None):
+    """Order the given {medicine_id: quantity} lines, or the user's saved cart, and empty the saved cart."""
+    # Fixed number of queries however many lines the cart has.
+    with transaction.atomic():
+        if quantities is None:
+            quantities = dict(CartItem.objects.filter(cart__user=user).values_list('medicine_id', 'quantity'))
+
+        # Our own holds count towards what we may buy; everyone else's do not.
+        # Reservations are locked before medicines, in the same order hold() uses.
+        held = reservations.held_for_update(user.pk, quantities)
+        # Lock in primary-key order so concurrent checkouts cannot deadlock.
+        medicines = list(
+            Medicine.objects.select_for_update()
+            .filter(pk__in=list(quantities))
+            .order_by('pk')
+            .only('id', 'name', 'price', 'stock', 'reserved')
+        )
+        # Lines for medicines deleted since they were added to the cart are dropped.
+        quantities = {m.pk: quantities[m.pk] for m in medicines}
+        if not quantities:
+            raise EmptyCart("Your cart is empty.")
+        short = [m for m in medicines if m.stock - m.reserved + held.get(m.pk, 0) < quantities[m.pk]]
+        if short:
+            raise OutOfStock(short)
+
+        # The stock__gte guards make the decrement itself refuse to oversell,
+        # even on backends where select_for_update is a no-op.
+        updated = Medicine.objects.filter(
+            reduce(or_, (
+                Q(pk=pk, stock__gte=F('reserved') + qty - held.get(pk, 0)) for pk, qty in quantities.items()
+            ))
+        ).update(
+            stock=Case(*[When(pk=pk, then=F('stock') - qty) for pk, qty in quantities.items()]),
+            reserved=Case(
+                *[When(pk=pk, then=F('reserved') - q) for pk, q in held.items()],
+                default=F('reserved'), output_field=PositiveIntegerField(),
+            ),
+            updated_at=timezone.now(),
+        )
+        if updated != len(quantities):
+            raise OutOfStock([])
+        if any(m.stock - m.reserved + held.get(m.pk, 0) == quantities[m.pk] for m in medicines):
+            # A product just sold out: cached listings and in-stock facet counts are stale.
+            transaction.on_commit(bump_catalog_version)
+
+        total = sum((m.price * quantities[m.pk] for m in medicines), Decimal('0.00'))
+        order = Order.objects.create(
+            user=user, address=address, total_amount=total, payment_status='cod', order_status='placed'
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, medicine=m, quantity=quantities[m.pk], price=m.price) for m in medicines
+        ])
+        recommendations.record_baskets([list(quantities)])
+        if prescription is not None:
+            prescription.user = user
+            prescription.order = order
+            prescription.save()
+        CartItem.objects.filter(cart__user=user).delete()
+        if held:
+            StockReservation.objects.filter(user=user, medicine_id__in=list(held)).delete()
+    return order
+
+# ---------- Status transitions ----------
+
+TRANSITION_CHUNK_SIZE = 1000
+
+def transition_orders(orders, status, changed_by=None):
+    """Move every order in ``orders`` that may reach ``status``; returns {previous status: count}.
+
+    Orders whose current status does not allow the move are left alone. The
+    allowed sources are part of the UPDATE's WHERE clause, so the database
+    enforces the transition table even against concurrent edits.
+    """
+    if status not in Order.ORDER_STATUS_TRANSITIONS:
+        raise TransitionError(f"Unknown order status: {status}")
+    sources = Order.sources_for(status)
+    moved = Counter()
+    if not sources:
+        return moved
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            orders.filter(order_status__in=sources).select_for_update().order_by('pk').values_list('pk', 'order_status')
+        )
+        for start in range(0, len(rows), TRANSITION_CHUNK_SIZE):
+            chunk = rows[start:start + TRANSITION_CHUNK_SIZE]
+            Order.objects.filter(pk__in=[pk for pk, _ in chunk], order_status__in=sources).update(
+                order_status=status, updated_at=now
+            )
+        OrderStatusHistory.objects.bulk_create(
+            [OrderStatusHistory(order_id=pk, from_status=source, to_status=status, changed_by=changed_by, changed_at=now)
+             for pk, source in rows],
+            batch_size=TRANSITION_CHUNK_SIZE,
+        )
+        moved.update(source for _, source in rows)
+        # update() skips the post_save counter signals, so adjust the per-status counters here.
+        deltas = {counters.status_counter(source): -n for source, n in moved.items()}
+        deltas[counters.status_counter(status)] = sum(moved.values())
+        counters.bump_many(deltas)
+        if status == 'cancelled' and rows:
+            analytics.adjust_sales([pk for pk, _ in rows], -1)
+    return moved
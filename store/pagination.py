@@ -0,0 +1,129 @@
+import base64
+import binascii
+from itertools import chain
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+class KeysetPage:
+    def __init__(self, object_list, per_page, next_url=None, previous_url=None):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.next_url = next_url
+        self.previous_url = previous_url
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_url is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_url is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+def encode_cursor(obj):
+    raw = f"{obj.created_at.isoformat()}|{obj.pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(value):
+    if not value:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)).decode()
+        created_at, pk = raw.rsplit('|', 1)
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    return (created_at, pk) if created_at else None
+
+def page_size(request, default=DEFAULT_PAGE_SIZE):
+    try:
+        size = int(request.GET.get('per_page', default))
+    except ValueError:
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+PARAMS = ('after', 'before', 'per_page')
+
+def cache_key(request):
+    """The page ``paginate()`` would return, as a cache key part: valid cursor and page size."""
+    after = request.GET.get('after')
+    after = after if decode_cursor(after) else None
+    before = None if after else request.GET.get('before')
+    return after, before if decode_cursor(before) else None, page_size(request)
+
+def _page_url(request, **cursor):
+    query = request.GET.copy()
+    query.pop('after', None)
+    query.pop('before', None)
+    query.update(cursor)
+    return f"?{query.urlencode()}"
+
+def _key(obj):
+    return (obj.created_at, obj.pk)
+
+def _window(querysets, condition, ordering, limit, reverse):
+    # Each source is its own index range scan; merging the heads gives the page.
+    rows = chain.from_iterable(qs.filter(condition).order_by(*ordering)[:limit] for qs in querysets)
+    return sorted(rows, key=_key, reverse=reverse)[:limit]
+
+def paginate(request, queryset, per_page=None):
+    # Newest first, keyed on (created_at, id) so each page is an index range scan.
+    # ``queryset`` may also be a list of querysets sharing that key and id space
+    # (hot and archived orders), read as one merged list.
+    querysets = queryset if isinstance(queryset, (list, tuple)) else [queryset]
+    per_page = per_page or page_size(request)
+    after = decode_cursor(request.GET.get('after'))
+    before = None if after else decode_cursor(request.GET.get('before'))
+
+    if before:
+        created_at, pk = before
+        condition = Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+        rows = _window(querysets, condition, ('created_at', 'pk'), per_page + 1, reverse=False)
+        more = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+    else:
+        condition = Q()
+        if after:
+            created_at, pk = after
+            condition = Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+        rows = _window(querysets, condition, ('-created_at', '-pk'), per_page + 1, reverse=True)
+        more = len(rows) > per_page
+        rows = rows[:per_page]
+
+    if not rows:
+        # Stale cursor (rows deleted since); offer a way back to the first page.
+        return KeysetPage(rows, per_page, previous_url=_page_url(request) if after or before else None)
+    has_next = more if not before else True
+    has_previous = more if before else bool(after)
+    return KeysetPage(
+        rows,
+        per_page,
+        next_url=_page_url(request, after=encode_cursor(rows[-1])) if has_next else None,
+        previous_url=_page_url(request, before=encode_cursor(rows[0])) if has_previous else None,
+    )
+
+async def apaginate(request, queryset, per_page=None):
+    """Forward-only ``paginate`` for async views over a single queryset (``after`` cursors only)."""
+    per_page = per_page or page_size(request)
+    after = decode_cursor(request.GET.get('after'))
+    if after:
+        created_at, pk = after
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+    rows = [obj async for obj in queryset.order_by('-created_at', '-pk')[:per_page + 1]]
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    return KeysetPage(rows, per_page, next_url=_page_url(request, after=encode_cursor(rows[-1])) if more else None)
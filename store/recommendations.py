@@ -0,0 +1,166 @@
+from collections import Counter, defaultdict
+from itertools import islice, permutations
+
+from django.db import connection, transaction
+from django.db.models import F, Max, Window
+from django.db.models.functions import RowNumber
+
+from . import caching
+from .models import ArchivedOrder, Medicine, MedicinePair, MedicinePairStaging, Order, OrderItem, Recommendation
+
+# "Frequently bought together": MedicinePair counts, for every two medicines
+# that were ever ordered together, how many orders contained both. Checkout
+# adds its order's pairs and re-ranks the TOP_K neighbours of the medicines in
+# it into Recommendation, so a product page reads one indexed (medicine, rank)
+# range, and that only on a cache miss.
+
+TOP_K = 6
+BATCH_SIZE = 500
+UPSERT_BATCH_SIZE = 300  # rows per INSERT; 3 parameters each
+CACHE_TIMEOUT = 15 * 60
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def _pairs(baskets):
+    pairs = Counter()
+    for basket in baskets:
+        pairs.update(permutations(sorted(set(basket)), 2))
+    return pairs
+
+def _add_pairs(pairs, model=MedicinePair):
+    # Adds to the stored counts inside the statement, so concurrent orders never lose an increment.
+    qn = connection.ops.quote_name
+    table, medicine, other, orders = (
+        qn(model._meta.db_table), qn('medicine_id'), qn('other_id'), qn('orders')
+    )
+    if connection.vendor == 'mysql':
+        conflict = f'ON DUPLICATE KEY UPDATE {orders} = {orders} + VALUES({orders})'
+    else:
+        conflict = f'ON CONFLICT ({medicine}, {other}) DO UPDATE SET {orders} = {table}.{orders} + EXCLUDED.{orders}'
+    with connection.cursor() as cursor:
+        for batch in _batched(pairs.items(), UPSERT_BATCH_SIZE):
+            values = ', '.join(['(%s, %s, %s)'] * len(batch))
+            params = [value for (a, b), n in batch for value in (a, b, n)]
+            cursor.execute(f'INSERT INTO {table} ({medicine}, {other}, {orders}) VALUES {values} {conflict}', params)
+
+def _ranked(medicine_ids):
+    ranked = (
+        MedicinePair.objects.filter(medicine_id__in=list(medicine_ids))
+        .annotate(position=Window(
+            RowNumber(), partition_by=[F('medicine_id')], order_by=[F('orders').desc(), F('other_id').asc()],
+        ))
+        .filter(position__lte=TOP_K)
+        .values_list('medicine_id', 'other_id', 'position', 'orders')
+    )
+    return [Recommendation(medicine_id=m, other_id=o, rank=rank, orders=n) for m, o, rank, n in ranked]
+
+def refresh_top(medicine_ids, replace=False):
+    """Re-rank the stored neighbours of ``medicine_ids`` from their pair counts.
+
+    ``replace`` first drops their current ranks, for counts that may have shrunk (call it in a transaction).
+    """
+    rows = _ranked(medicine_ids)
+    if replace:
+        Recommendation.objects.filter(medicine_id__in=list(medicine_ids)).delete()
+    if rows:
+        # Counts only grow, so a medicine never loses ranks it had; overwrite them in place.
+        target = ['medicine', 'rank'] if connection.features.supports_update_conflicts_with_target else None
+        Recommendation.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=target, update_fields=['other', 'orders'],
+            batch_size=BATCH_SIZE,
+        )
+
+def record_baskets(baskets):
+    """Count the medicines of each basket (an iterable of medicine ids) as bought together.
+
+    Call it inside the transaction that creates the orders. A pair only involves
+    medicines that checkout has already locked, so concurrent orders cannot deadlock on it.
+    """
+    pairs = _pairs(baskets)
+    if not pairs:
+        return
+    _add_pairs(pairs)
+    for batch in _batched(sorted({m for m, _ in pairs}), BATCH_SIZE):
+        refresh_top(batch)
+
+def _hot_baskets(ids):
+    baskets = defaultdict(list)
+    for order_id, medicine_id in OrderItem.objects.filter(order_id__in=ids, medicine__isnull=False).values_list(
+        'order_id', 'medicine_id'
+    ):
+        baskets[order_id].append(medicine_id)
+    return baskets.values()
+
+def _recount(model, orders, batch_size):
+    # Adds the pairs of ``orders`` (a hot Order queryset) into ``model``; returns orders read.
+    read = 0
+    last = 0
+    while ids := list(orders.filter(pk__gt=last).order_by('pk').values_list('pk', flat=True)[:batch_size]):
+        _add_pairs(_pairs(_hot_baskets(ids)), model)
+        read += len(ids)
+        last = ids[-1]
+    return read
+
+def rebuild(batch_size=BATCH_SIZE):
+    """Recount every pair from hot and archived orders; returns orders read.
+
+    Counts go into MedicinePairStaging, ``batch_size`` orders at a time, and
+    replace MedicinePair in one transaction, so product pages keep their
+    recommendations meanwhile. Orders placed after the rebuild started are
+    counted by checkout and carried over at the swap. Orders moved by
+    archive_orders/restore_orders while it runs may be counted twice or missed.
+    """
+    MedicinePairStaging.objects.all().delete()  # leftovers of an interrupted run
+    # Archived orders keep their pk, so the mark covers both tables.
+    high = max(model.objects.aggregate(high=Max('pk'))['high'] or 0 for model in (Order, ArchivedOrder))
+    read = _recount(MedicinePairStaging, Order.objects.filter(pk__lte=high), batch_size)
+
+    existing = set(Medicine.objects.values_list('pk', flat=True))
+    last = 0
+    while rows := list(
+        ArchivedOrder.objects.filter(pk__gt=last, pk__lte=high).order_by('pk').values_list('pk', 'payload')[:batch_size]
+    ):
+        baskets = [[line[0] for line in payload.get('items', []) if line[0] in existing] for _, payload in rows]
+        _add_pairs(_pairs(baskets), MedicinePairStaging)
+        read += len(rows)
+        last = rows[-1][0]
+
+    qn = connection.ops.quote_name
+    live, staging, medicine_table = (
+        qn(MedicinePair._meta.db_table), qn(MedicinePairStaging._meta.db_table), qn(Medicine._meta.db_table)
+    )
+    columns = ', '.join(qn(c) for c in ('medicine_id', 'other_id', 'orders'))
+    with transaction.atomic():
+        MedicinePair.objects.all().delete()
+        with connection.cursor() as cursor:
+            # Medicines deleted since they were counted are left out.
+            cursor.execute(
+                f'INSERT INTO {live} ({columns}) SELECT {columns} FROM {staging} '
+                f'WHERE {qn("medicine_id")} IN (SELECT {qn("id")} FROM {medicine_table}) '
+                f'AND {qn("other_id")} IN (SELECT {qn("id")} FROM {medicine_table})'
+            )
+        # Checkout added these to the rows just replaced.
+        read += _recount(MedicinePair, Order.objects.filter(pk__gt=high), batch_size)
+        MedicinePairStaging.objects.all().delete()
+
+    # Re-rank in batches; each batch's ranks are replaced in one transaction.
+    medicines = MedicinePair.objects.values_list('medicine_id', flat=True).distinct().order_by('medicine_id')
+    for batch in _batched(medicines.iterator(), batch_size):
+        with transaction.atomic():
+            refresh_top(batch, replace=True)
+    Recommendation.objects.exclude(medicine_id__in=MedicinePair.objects.values('medicine_id')).delete()
+    return read
+
+def bought_together(medicine_id):
+    return caching.cached(
+        ('bought-together', medicine_id),
+        lambda: list(
+            Medicine.objects.filter(recommended_with__medicine_id=medicine_id)
+            .order_by('recommended_with__rank')
+            .only('id', 'name', 'slug', 'price', 'image', 'image_variants', 'rx_required')
+        ),
+        timeout=CACHE_TIMEOUT,
+    )
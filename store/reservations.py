@@ -0,0 +1,124 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, When
+from django.utils import timezone
+
+from .caching import bump_catalog_version
+from .models import Medicine, StockReservation
+
+# Cart lines of signed-in users hold stock for STOCK_RESERVATION_TTL seconds
+# (refreshed on every cart change); 0 turns reservations off. Medicine.reserved
+# is the running total of active holds, so available = stock - reserved is read
+# straight off the product row.
+
+SWEEP_BATCH_SIZE = 1000
+
+def ttl():
+    return getattr(settings, 'STOCK_RESERVATION_TTL', 15 * 60)
+
+def enabled():
+    return ttl() > 0
+
+def _reserve(medicine_id, delta):
+    # One indexed UPDATE that only succeeds while enough unreserved stock remains. Taking
+    # the last units is a second UPDATE so it can bump the catalog version: cached
+    # listings filtered on availability must drop the product.
+    medicine = Medicine.objects.filter(pk=medicine_id)
+    if medicine.filter(stock__gt=F('reserved') + delta).update(reserved=F('reserved') + delta):
+        return True
+    if medicine.filter(stock=F('reserved') + delta).update(reserved=F('reserved') + delta):
+        transaction.on_commit(bump_catalog_version)
+        return True
+    return False
+
+def hold(user_id, targets):
+    """Set ``user_id``'s holds to the {medicine_id: quantity} targets.
+
+    Returns {medicine_id: quantity still held} for the targets that could not be held.
+    """
+    failed = {}
+    if not targets:
+        return failed
+    with transaction.atomic():
+        # Every hold of this user, so the upsert below can also extend the ones not being changed.
+        held = dict(
+            StockReservation.objects.select_for_update()
+            .filter(user_id=user_id)
+            .values_list('medicine_id', 'quantity')
+        )
+        releases = {}
+        for medicine_id, quantity in targets.items():
+            delta = quantity - held.get(medicine_id, 0)
+            if delta > 0 and not _reserve(medicine_id, delta):
+                # Expired holds may be what stands in the way: release them (our own
+                # included, so re-read it) and retry once.
+                release_expired(medicine_ids=[medicine_id])
+                held[medicine_id] = StockReservation.objects.filter(
+                    user_id=user_id, medicine_id=medicine_id
+                ).values_list('quantity', flat=True).first() or 0
+                delta = quantity - held[medicine_id]
+                if delta > 0 and not _reserve(medicine_id, delta):
+                    failed[medicine_id] = held[medicine_id]
+                    continue
+            if delta < 0:
+                releases[medicine_id] = -delta
+            held[medicine_id] = quantity
+
+        if releases:
+            if Medicine.objects.filter(pk__in=list(releases), stock__lte=F('reserved')).exists():
+                # Products shown as out of stock are about to come back.
+                transaction.on_commit(bump_catalog_version)
+            Medicine.objects.filter(pk__in=list(releases)).update(
+                reserved=Case(*[When(pk=pk, then=F('reserved') - q) for pk, q in releases.items()])
+            )
+        drop = [pk for pk, q in held.items() if q <= 0]
+        if drop:
+            StockReservation.objects.filter(user_id=user_id, medicine_id__in=drop).delete()
+        # Any change to the cart keeps the whole cart held for another TTL.
+        expires_at = timezone.now() + timedelta(seconds=ttl())
+        keep = [StockReservation(user_id=user_id, medicine_id=pk, quantity=q, expires_at=expires_at)
+                for pk, q in held.items() if q > 0]
+        if keep:
+            # MySQL upserts on any unique key and rejects an explicit target.
+            target = ['user', 'medicine'] if connection.features.supports_update_conflicts_with_target else None
+            StockReservation.objects.bulk_create(
+                keep, update_conflicts=True, unique_fields=target, update_fields=['quantity', 'expires_at'],
+            )
+    return failed
+
+def held_for_update(user_id, medicine_ids):
+    """{medicine_id: quantity} held by ``user_id``, locked until the end of the transaction."""
+    return dict(
+        StockReservation.objects.select_for_update()
+        .filter(user_id=user_id, medicine_id__in=list(medicine_ids))
+        .values_list('medicine_id', 'quantity')
+    )
+
+def release_expired(now=None, medicine_ids=None, batch_size=SWEEP_BATCH_SIZE):
+    """Release expired holds in batches, one grouped UPDATE and one DELETE per batch; returns rows released."""
+    now = now or timezone.now()
+    released = 0
+    while True:
+        with transaction.atomic():
+            expired = StockReservation.objects.select_for_update().filter(expires_at__lte=now)
+            if medicine_ids is not None:
+                expired = expired.filter(medicine_id__in=medicine_ids)
+            rows = list(expired.order_by('pk').values_list('pk', 'medicine_id', 'quantity')[:batch_size])
+            if not rows:
+                return released
+            totals = defaultdict(int)
+            for _, medicine_id, quantity in rows:
+                totals[medicine_id] += quantity
+            if Medicine.objects.filter(pk__in=list(totals), stock__lte=F('reserved')).exists():
+                # Products shown as out of stock are about to come back.
+                transaction.on_commit(bump_catalog_version)
+            Medicine.objects.filter(pk__in=list(totals)).update(
+                reserved=Case(*[When(pk=pk, then=F('reserved') - q) for pk, q in totals.items()])
+            )
+            StockReservation.objects.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+        released += len(rows)
+        if len(rows) < batch_size:
+            return released
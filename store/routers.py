@@ -0,0 +1,103 @@
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .caching import CATALOG_CHANGED_KEY
+
+# Writes always go to the primary ("default"). Reads go to a replica from
+# DATABASE_REPLICAS only inside views marked @replica_reads, outside any
+# transaction, and only when the visitor has not written in the last
+# REPLICA_STICKY_SECONDS (ReadYourWritesMiddleware's cookie) and the catalog
+# has not changed in that window, so catalog caches are never refilled from a
+# replica that has not caught up yet.
+
+PIN_COOKIE = 'db_primary'
+# Sessions and carts must always see the write made by the previous request
+# (a cart read here is cached for days).
+PRIMARY_ONLY = {'sessions.session', 'store.cart', 'store.cartitem', 'store.stockreservation'}
+
+_replica_ok = ContextVar('replica_ok', default=False)
+_request_writes = ContextVar('request_writes', default=None)
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+def sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 15)
+
+def _pinned(request, changed):
+    if PIN_COOKIE in request.COOKIES:
+        return True
+    return changed is not None and time.time() - changed < sticky_seconds()
+
+def pinned(request):
+    return _pinned(request, None if PIN_COOKIE in request.COOKIES else cache.get(CATALOG_CHANGED_KEY))
+
+async def apinned(request):
+    return _pinned(request, None if PIN_COOKIE in request.COOKIES else await cache.aget(CATALOG_CHANGED_KEY))
+
+def replica_reads(view):
+    """Let the view's reads go to a replica; they fall back to the primary when the visitor is pinned."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if not replicas() or await apinned(request):
+                return await view(request, *args, **kwargs)
+            # Async ORM calls run in a thread with a copy of this context, so they see the flag.
+            token = _replica_ok.set(True)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _replica_ok.reset(token)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not replicas() or pinned(request):
+            return view(request, *args, **kwargs)
+        token = _replica_ok.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica_ok.reset(token)
+    return wrapper
+
+def track_writes():
+    """Record whether the current request writes; hand the token back to reset_writes() afterwards."""
+    state = {'wrote': False}
+    return _request_writes.set(state), state
+
+def reset_writes(token):
+    _request_writes.reset(token)
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _request_writes.get()
+        if (
+            not _replica_ok.get()
+            or (state is not None and state['wrote'])  # read back what this request just wrote
+            or model._meta.label_lower in PRIMARY_ONLY
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas())
+
+    def db_for_write(self, model, **hints):
+        state = _request_writes.get()
+        if state is not None:
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication.
+        return db not in replicas()
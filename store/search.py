@@ -0,0 +1,182 @@
+import re
+import unicodedata
+from collections import defaultdict
+from itertools import islice
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, FloatField, IntegerField, Max, Sum, Value, When
+
+from .models import Medicine, SearchTerm, SearchToken, SearchTrigram
+
+# Field -> weight of a token found in that field.
+FIELD_WEIGHTS = (('name', 8), ('brand', 4), ('category', 3), ('description', 1))
+
+MIN_TOKEN_LENGTH = 2
+MAX_TOKEN_LENGTH = 64
+MAX_QUERY_TOKENS = 6
+PREFIX_CANDIDATES = 20
+FUZZY_CANDIDATES = 8
+FUZZY_MIN_SIMILARITY = 0.35
+RESULT_LIMIT = 200
+BATCH_SIZE = 500
+
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+# ---------- Text processing ----------
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+
+def tokenize(text):
+    tokens = {}
+    for token in TOKEN_RE.findall(normalize(text)):
+        if len(token) >= MIN_TOKEN_LENGTH:
+            tokens.setdefault(token[:MAX_TOKEN_LENGTH], None)
+    return list(tokens)
+
+def trigrams(token):
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def document_weights(medicine):
+    fields = {
+        'name': medicine.name,
+        'brand': medicine.brand,
+        'category': medicine.category.name if medicine.category_id else '',
+        'description': medicine.description,
+    }
+    weights = defaultdict(int)
+    for field, weight in FIELD_WEIGHTS:
+        for token in tokenize(fields[field]):
+            weights[token] += weight
+    return weights
+
+# ---------- Indexing ----------
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def _add_terms(tokens):
+    known = set(SearchTerm.objects.filter(token__in=tokens).values_list('token', flat=True))
+    missing = [t for t in tokens if t not in known]
+    if not missing:
+        return
+    SearchTerm.objects.bulk_create([SearchTerm(token=t) for t in missing], ignore_conflicts=True)
+    terms = SearchTerm.objects.filter(token__in=missing).values_list('id', 'token')
+    SearchTrigram.objects.bulk_create(
+        [SearchTrigram(trigram=g, term_id=term_id) for term_id, token in terms for g in trigrams(token)],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+def _insert_postings(postings):
+    # Plain executemany: bulk_create's per-object model overhead dominates reindexing.
+    qn = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}, {}, {}) VALUES (%s, %s, %s)'.format(
+        qn(SearchToken._meta.db_table), qn('token'), qn('medicine_id'), qn('weight')
+    )
+    with connection.cursor() as cursor:
+        for batch in _batched(postings, BATCH_SIZE * 10):
+            cursor.executemany(sql, batch)
+
+def index_medicines(medicines):
+    """Replace the postings of ``medicines`` (category must be loaded)."""
+    medicines = list(medicines)
+    if not medicines:
+        return
+    postings = []
+    for medicine in medicines:
+        for token, weight in document_weights(medicine).items():
+            postings.append((token, medicine.pk, min(weight, 32767)))
+    with transaction.atomic():
+        SearchToken.objects.filter(medicine_id__in=[m.pk for m in medicines]).delete()
+        _insert_postings(postings)
+        _add_terms(sorted({token for token, _, _ in postings}))
+
+def index_queryset(queryset, batch_size=BATCH_SIZE):
+    count = 0
+    rows = queryset.select_related('category').order_by('pk').iterator(chunk_size=batch_size)
+    for batch in _batched(rows, batch_size):
+        index_medicines(batch)
+        count += len(batch)
+    return count
+
+def index_ids(ids):
+    return index_queryset(Medicine.objects.filter(pk__in=ids))
+
+def rebuild(batch_size=BATCH_SIZE):
+    with transaction.atomic():
+        SearchToken.objects.all().delete()
+        SearchTrigram.objects.all().delete()
+        SearchTerm.objects.all().delete()
+    return index_queryset(Medicine.objects.all(), batch_size=batch_size)
+
+# ---------- Querying ----------
+
+def _expand(token):
+    # Candidate index terms for one query token, mapped to a similarity in (0, 1].
+    upper = token + '\uffff'
+    prefixed = SearchTerm.objects.filter(token__gte=token, token__lt=upper).order_by('token')
+    candidates = {}
+    for term in prefixed.values_list('token', flat=True)[:PREFIX_CANDIDATES]:
+        candidates[term] = 1.0 if term == token else 0.5 + 0.4 * len(token) / len(term)
+    if token in candidates or len(token) < 3:
+        return candidates
+
+    grams = trigrams(token)
+    shared = (
+        SearchTrigram.objects.filter(trigram__in=grams)
+        .values('term__token')
+        .annotate(shared=Count('id'))
+        .order_by('-shared')[:FUZZY_CANDIDATES * 4]
+    )
+    fuzzy = []
+    for row in shared:
+        term = row['term__token']
+        similarity = row['shared'] / (len(grams) + len(trigrams(term)) - row['shared'])
+        if similarity >= FUZZY_MIN_SIMILARITY:
+            fuzzy.append((similarity, term))
+    for similarity, term in sorted(fuzzy, reverse=True)[:FUZZY_CANDIDATES]:
+        candidates[term] = max(candidates.get(term, 0), 0.9 * similarity)
+    return candidates
+
+def ranked_ids(query, queryset=None, limit=RESULT_LIMIT):
+    tokens = tokenize(query)[:MAX_QUERY_TOKENS]
+    best = {}  # candidate term -> (similarity, query token position)
+    for position, token in enumerate(tokens):
+        for term, similarity in _expand(token).items():
+            if similarity > best.get(term, (0, None))[0]:
+                best[term] = (similarity, position)
+    if not best:
+        return []
+
+    groups = defaultdict(list)
+    for term, (_, position) in best.items():
+        groups[position].append(term)
+    hits = sum(
+        (Max(Case(When(token__in=terms, then=Value(1)), default=Value(0), output_field=IntegerField()))
+         for terms in groups.values()),
+        Value(0),
+    )
+    similarity = Case(
+        *[When(token=term, then=Value(sim)) for term, (sim, _) in best.items()],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    postings = SearchToken.objects.filter(token__in=list(best))
+    if queryset is not None:
+        postings = postings.filter(medicine_id__in=queryset.values('pk'))
+    rows = (
+        postings.values('medicine_id')
+        .annotate(hits=hits, score=Sum(similarity * F('weight'), output_field=FloatField()))
+        .order_by('-hits', '-score', 'medicine_id')[:limit]
+    )
+    return [row['medicine_id'] for row in rows]
+
+def search_medicines(query, queryset=None, limit=RESULT_LIMIT):
+    ids = ranked_ids(query, queryset, limit)
+    found = (queryset if queryset is not None else Medicine.objects.all()).in_bulk(ids)
+    return [found[pk] for pk in ids if pk in found]
@@ -0,0 +1,117 @@
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import analytics, counters, images, search
+from .caching import bump_catalog_version
+from .cart import CartStore, merge_anonymous_cart
+from .models import Category, Medicine, Order
+
+# ---------- Search index ----------
+
+@receiver(post_save, sender=Medicine)
+def index_saved_medicine(sender, instance, **kwargs):
+    transaction.on_commit(lambda: search.index_ids([instance.pk]))
+
+@receiver(post_save, sender=Category)
+def reindex_category_medicines(sender, instance, created, **kwargs):
+    if not created:
+        transaction.on_commit(lambda: search.index_queryset(instance.medicines.all()))
+
+@receiver(pre_delete, sender=Category)
+def remember_category_medicines(sender, instance, **kwargs):
+    instance._medicine_ids = list(instance.medicines.values_list('pk', flat=True))
+
+@receiver(post_delete, sender=Category)
+def reindex_uncategorised_medicines(sender, instance, **kwargs):
+    ids = getattr(instance, '_medicine_ids', [])
+    if ids:
+        transaction.on_commit(lambda: search.index_ids(ids))
+
+# ---------- Catalog cache ----------
+
+@receiver(post_save, sender=Medicine)
+@receiver(post_delete, sender=Medicine)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def expire_catalog_cache(sender, **kwargs):
+    transaction.on_commit(bump_catalog_version)
+
+# ---------- Dashboard counters ----------
+
+@receiver(post_save, sender=User)
+def count_new_user(sender, instance, created, **kwargs):
+    if created:
+        counters.bump(counters.USERS)
+
+@receiver(post_delete, sender=User)
+def count_deleted_user(sender, instance, **kwargs):
+    counters.bump(counters.USERS, -1)
+
+@receiver(post_save, sender=Medicine)
+def count_new_medicine(sender, instance, created, **kwargs):
+    if created:
+        counters.bump(counters.MEDICINES)
+
+@receiver(post_delete, sender=Medicine)
+def count_deleted_medicine(sender, instance, **kwargs):
+    counters.bump(counters.MEDICINES, -1)
+
+def _track_order(order):
+    # Read straight from __dict__ so deferred fields are never loaded.
+    order._counted = (order.__dict__.get('order_status'), order.__dict__.get('total_amount'))
+
+@receiver(post_init, sender=Order)
+def remember_order_state(sender, instance, **kwargs):
+    _track_order(instance)
+
+@receiver(post_save, sender=Order)
+def count_saved_order(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_many({counters.ORDERS: 1, counters.status_counter(instance.order_status): 1})
+        counters.record_orders(counters.order_date(instance), 1, instance.total_amount)
+    else:
+        status, total = instance._counted
+        if status is not None and status != instance.order_status:
+            counters.bump_many({
+                counters.status_counter(status): -1,
+                counters.status_counter(instance.order_status): 1,
+            })
+            if 'cancelled' in (status, instance.order_status):
+                analytics.adjust_sales([instance.pk], -1 if instance.order_status == 'cancelled' else 1)
+        if total is not None and total != instance.total_amount:
+            counters.record_orders(counters.order_date(instance), revenue=instance.total_amount - total)
+    _track_order(instance)
+
+@receiver(post_delete, sender=Order)
+def count_deleted_order(sender, instance, **kwargs):
+    status, total = instance._counted
+    counters.bump_many({counters.ORDERS: -1, counters.status_counter(status or instance.order_status): -1})
+    counters.record_orders(counters.order_date(instance), -1, -(total if total is not None else instance.total_amount))
+
+# ---------- Image derivatives ----------
+
+@receiver(post_init, sender=Medicine)
+def remember_image(sender, instance, **kwargs):
+    instance._image_name = str(instance.__dict__.get('image') or '')
+
+@receiver(post_save, sender=Medicine)
+def rebuild_image_derivatives(sender, instance, raw=False, **kwargs):
+    name = instance.image.name or ''
+    if not raw and name != instance._image_name:
+        images.schedule(instance.pk, stale=instance.image_variants or None)
+    instance._image_name = name
+
+# ---------- Write-behind cart ----------
+
+@receiver(user_logged_in)
+def merge_cart_on_login(sender, request, user, **kwargs):
+    if request is not None and hasattr(request, 'session'):
+        merge_anonymous_cart(request, user)
+
+@receiver(user_logged_out)
+def flush_cart_on_logout(sender, request, user, **kwargs):
+    if user is not None:
+        CartStore(user_id=user.pk).flush()
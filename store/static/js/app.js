@@ -1 +1,83 @@
-console.log('MediShop loaded');
+// Search-as-you-type: debounced requests to the suggestion endpoint, one in flight at a time.
+(function () {
+    var input = document.querySelector('input[data-suggest-url]');
+    if (!input) return;
+    var DELAY = 150;
+    var url = input.dataset.suggestUrl;
+    var list = document.createElement('ul');
+    list.className = 'suggest';
+    list.hidden = true;
+    input.parentNode.appendChild(list);
+    var timer = null, pending = null, active = -1, last = '';
+    var results = {};
+
+    function render(items) {
+        list.innerHTML = '';
+        active = -1;
+        items.forEach(function (item) {
+            var li = document.createElement('li');
+            var a = document.createElement('a');
+            a.href = item.url;
+            a.textContent = item.label;
+            if (item.kind !== 'medicine') {
+                var kind = document.createElement('span');
+                kind.className = 'kind';
+                kind.textContent = item.kind;
+                a.appendChild(kind);
+            }
+            li.appendChild(a);
+            list.appendChild(li);
+        });
+        list.hidden = !items.length;
+    }
+
+    function fetchSuggestions(q) {
+        if (results[q]) return render(results[q]);
+        if (pending) pending.abort();
+        pending = new AbortController();
+        fetch(url + '?q=' + encodeURIComponent(q), {signal: pending.signal})
+            .then(function (r) { return r.ok ? r.json() : {suggestions: []}; })
+            .then(function (data) {
+                results[q] = data.suggestions;
+                if (input.value.trim() === q) render(data.suggestions);
+            })
+            .catch(function () {});
+    }
+
+    function highlight(step) {
+        var items = list.querySelectorAll('a');
+        if (!items.length) return;
+        active = (active + step + items.length) % items.length;
+        items.forEach(function (a, i) { a.classList.toggle('active', i === active); });
+    }
+
+    input.addEventListener('input', function () {
+        var q = input.value.trim();
+        clearTimeout(timer);
+        if (q === last) return;
+        last = q;
+        if (!q) return render([]);
+        timer = setTimeout(function () { fetchSuggestions(q); }, DELAY);
+    });
+
+    input.addEventListener('keydown', function (e) {
+        if (list.hidden) return;
+        if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+            e.preventDefault();
+            highlight(e.key === 'ArrowDown' ? 1 : -1);
+        } else if (e.key === 'Enter' && active >= 0) {
+            e.preventDefault();
+            window.location = list.querySelectorAll('a')[active].href;
+        } else if (e.key === 'Escape') {
+            list.hidden = true;
+        }
+    });
+
+    input.addEventListener('blur', function () {
+        // Let a click on a suggestion land first.
+        setTimeout(function () { list.hidden = true; }, 150);
+    });
+    input.addEventListener('focus', function () {
+        if (list.children.length) list.hidden = false;
+    });
+})();
@@ -0,0 +1,43 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # optional: without it only .gz siblings are written
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ico')
+MIN_SIZE = 256
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Content-hashed file names plus precompressed .gz/.br siblings written at collectstatic time."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in paths:
+            hashed = self.stored_name(name)
+            for path in {name, hashed}:
+                if path.endswith(COMPRESSIBLE):
+                    self._compress(path)
+
+    def _compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as fh:
+            data = fh.read()
+        if len(data) < MIN_SIZE:
+            return
+        encoders = [('.gz', lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            encoders.append(('.br', lambda raw: brotli.compress(raw, quality=11)))
+        for suffix, encode in encoders:
+            compressed = encode(data)
+            # Only worth serving when it actually saves bytes.
+            if len(compressed) < len(data) * 0.95:
+                with open(path + suffix, 'wb') as fh:
+                    fh.write(compressed)
+            elif os.path.exists(path + suffix):
+                os.remove(path + suffix)
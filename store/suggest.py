@@ -0,0 +1,254 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+from functools import lru_cache
+from itertools import islice
+from urllib.parse import urlencode
+
+from django.db import connection
+from django.db.models import Sum
+from django.urls import reverse
+from django.utils import timezone
+
+from . import caching
+from .models import Category, DailyMedicineSales, Medicine
+from .search import TOKEN_RE, normalize
+
+# Search-as-you-type runs against an in-process index of medicine, brand and
+# category names: every word-start suffix of a name is a key in one sorted
+# list, so a prefix is a bisect away. Entries are pre-sorted by popularity
+# (units sold over POPULARITY_DAYS), which makes "top N" the N smallest entry
+# numbers in the matching key range; very short prefixes are precomputed.
+# Each process loads the index in a background thread on first use. When the
+# catalog version moves it re-reads only the medicines changed since, and
+# indexes just those (plus brands and categories) in a small overlay searched
+# alongside the base; a request never waits for a full build.
+
+SUGGEST_LIMIT = 8
+MAX_LIMIT = 20
+PRECOMPUTED_PREFIX = 2
+POPULARITY_DAYS = 30
+CHECK_INTERVAL = 1.0          # seconds between catalog version checks
+RELOAD_INTERVAL = 15 * 60     # full reload (popularity, deletions) at least this often
+OVERLAY_LIMIT = 2000          # changed medicines kept outside the base index before a full reload
+CHANGE_SLACK = timedelta(seconds=60)  # rows are stamped before they commit
+KIND_ORDER = {'medicine': 0, 'category': 1, 'brand': 2}
+
+class Suggestion(namedtuple('Suggestion', 'kind label key popularity')):
+    __slots__ = ()
+
+    @property
+    def url(self):
+        # Resolved only for the handful of results actually returned.
+        if self.kind == 'medicine':
+            return reverse('product_detail', args=[self.key])
+        if self.kind == 'category':
+            return reverse('product_list_by_category', args=[self.key])
+        return f"{reverse('product_list')}?{urlencode({'brand': self.key})}"
+
+def _phrase(text):
+    return ' '.join(TOKEN_RE.findall(normalize(text)))
+
+@lru_cache(maxsize=65536)
+def _keys(label):
+    words = TOKEN_RE.findall(normalize(label))
+    return frozenset(' '.join(words[i:]) for i in range(len(words)))
+
+def _rank(entry):
+    return -entry.popularity, KIND_ORDER[entry.kind], entry.label
+
+class PrefixIndex:
+    """Immutable sorted-array prefix index over ``Suggestion`` entries."""
+
+    def __init__(self, entries):
+        self.entries = sorted(entries, key=_rank)
+        self.positions = {(entry.kind, entry.key): i for i, entry in enumerate(self.entries)}
+        pairs = sorted((key, i) for i, entry in enumerate(self.entries) for key in _keys(entry.label))
+        self.keys = [key for key, _ in pairs]
+        self.refs = [i for _, i in pairs]
+        short = defaultdict(set)
+        for key, i in pairs:
+            for n in range(1, min(PRECOMPUTED_PREFIX, len(key)) + 1):
+                short[key[:n]].add(i)
+        self.top = {prefix: heapq.nsmallest(MAX_LIMIT, refs) for prefix, refs in short.items()}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def search(self, text, limit=SUGGEST_LIMIT, hidden=frozenset()):
+        """The best ``limit`` entries matching ``text``, skipping the entry numbers in ``hidden``."""
+        prefix = _phrase(text)
+        if not prefix:
+            return []
+        found = None
+        if len(prefix) <= PRECOMPUTED_PREFIX:
+            top = self.top.get(prefix, [])
+            found = [i for i in top if i not in hidden][:limit]
+            if len(found) < limit and len(top) == MAX_LIMIT and len(found) < len(top):
+                found = None  # hidden entries made room for ones beyond the precomputed top
+        if found is None:
+            lo = bisect_left(self.keys, prefix)
+            hi = bisect_left(self.keys, prefix + '\uffff', lo)
+            found = heapq.nsmallest(limit, set(self.refs[lo:hi]).difference(hidden))
+        return [self.entries[i] for i in found]
+
+class LayeredIndex:
+    """A base PrefixIndex with some entries hidden, searched together with a small overlay."""
+
+    def __init__(self, base, hidden, overlay):
+        self.base = base
+        self.hidden = frozenset(base.positions[key] for key in hidden if key in base.positions)
+        self.overlay = overlay
+
+    def search(self, text, limit=SUGGEST_LIMIT):
+        found = heapq.merge(self.base.search(text, limit, self.hidden), self.overlay.search(text, limit), key=_rank)
+        return list(islice(found, limit))
+
+class _Catalog:
+    """One full load of the suggestable names, kept current by re-reading changed medicines.
+
+    The base index covers medicines and brands as loaded; medicines changed
+    since, the brands they touch and all categories go into the overlay.
+    """
+
+    def __init__(self):
+        self.version = caching.catalog_version()
+        self.loaded_at = timezone.now()
+        self.medicines = {  # pk -> (name, slug, brand, category_id)
+            pk: tuple(row) for pk, *row in Medicine.objects.values_list('pk', 'name', 'slug', 'brand', 'category_id')
+        }
+        since = timezone.localdate() - timedelta(days=POPULARITY_DAYS - 1)
+        self.popularity = dict(  # pk -> units sold
+            DailyMedicineSales.objects.filter(date__gte=since)
+            .values('medicine_id').annotate(units=Sum('units')).values_list('medicine_id', 'units')
+            .order_by()
+        )
+        self.brands = defaultdict(lambda: [0, 0])  # brand -> [medicines, units sold]
+        self.category_units = defaultdict(int)
+        for pk, row in self.medicines.items():
+            self._count(pk, row, 1)
+        self.base_medicines = dict(self.medicines)
+        self.changed = set()
+        self.touched_brands = set()
+        self.base = PrefixIndex(
+            [Suggestion('medicine', name, slug, self.popularity.get(pk, 0))
+             for pk, (name, slug, _, _) in self.medicines.items()]
+            + [Suggestion('brand', brand, brand, units) for brand, (_, units) in self.brands.items()]
+        )
+
+    def _count(self, pk, row, sign):
+        _, _, brand, category_id = row
+        units = self.popularity.get(pk, 0)
+        if brand:
+            self.brands[brand][0] += sign
+            self.brands[brand][1] += sign * units
+        if category_id:
+            self.category_units[category_id] += sign * units
+
+    def load_changes(self, version):
+        """Re-read medicines changed since the last read; False when a full load is needed instead."""
+        started = timezone.now()
+        changed = Medicine.objects.filter(updated_at__gte=self.loaded_at - CHANGE_SLACK)
+        for pk, *row in changed.values_list('pk', 'name', 'slug', 'brand', 'category_id'):
+            row = tuple(row)
+            old = self.medicines.get(pk)
+            if old == row:
+                continue
+            if old is not None:
+                self._count(pk, old, -1)
+                self.touched_brands.add(old[2])
+            self._count(pk, row, 1)
+            self.touched_brands.add(row[2])
+            self.medicines[pk] = row
+            self.changed.add(pk)
+        self.loaded_at = started
+        self.version = version
+        # Deletions leave no updated_at behind; a count mismatch is the sign of one.
+        return len(self.changed) <= OVERLAY_LIMIT and Medicine.objects.count() == len(self.medicines)
+
+    def index(self):
+        hidden, entries = set(), []
+        for pk in self.changed:
+            old = self.base_medicines.get(pk)
+            if old is not None:
+                hidden.add(('medicine', old[1]))
+            name, slug, _, _ = self.medicines[pk]
+            entries.append(Suggestion('medicine', name, slug, self.popularity.get(pk, 0)))
+        for brand in filter(None, self.touched_brands):
+            hidden.add(('brand', brand))
+            count, units = self.brands[brand]
+            if count:
+                entries.append(Suggestion('brand', brand, brand, units))
+        for pk, name, slug in Category.objects.values_list('pk', 'name', 'slug'):
+            entries.append(Suggestion('category', name, slug, self.category_units.get(pk, 0)))
+        return LayeredIndex(self.base, hidden, PrefixIndex(entries))
+
+class SuggestionIndex:
+    """The per-process index plus what it takes to refresh it from the database.
+
+    Full loads (first use, every RELOAD_INTERVAL, after a deletion or once the
+    overlay grows past OVERLAY_LIMIT medicines) run in a background thread and
+    are swapped in when done; requests keep the previous snapshot meanwhile,
+    and get no suggestions while a process loads for the first time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self._catalog = None
+        self._building = False
+        self._full_load = 0.0
+        self._checked = 0.0
+
+    def search(self, text, limit=SUGGEST_LIMIT):
+        index = self._current()
+        return index.search(text, limit) if index is not None else []
+
+    def _current(self):
+        now = time.monotonic()
+        # One thread checks for changes while the rest keep the current snapshot.
+        if now - self._checked >= CHECK_INTERVAL and self._lock.acquire(blocking=False):
+            try:
+                if now - self._checked >= CHECK_INTERVAL:
+                    self._refresh(now)
+            finally:
+                self._lock.release()
+        return self._index
+
+    def _refresh(self, now):
+        self._checked = now
+        catalog = self._catalog
+        if catalog is None or now - self._full_load >= RELOAD_INTERVAL:
+            self._load_in_background()
+        if catalog is None:
+            return
+        version = caching.catalog_version()
+        if version != catalog.version:
+            if catalog.load_changes(version):
+                self._index = catalog.index()
+            else:
+                self._load_in_background()
+
+    def _load_in_background(self):
+        if not self._building:
+            self._building = True
+            threading.Thread(target=self._load, name='suggest-index', daemon=True).start()
+
+    def _load(self):
+        try:
+            catalog = _Catalog()
+            index = catalog.index()
+            with self._lock:
+                self._catalog, self._index = catalog, index
+                self._full_load = time.monotonic()
+        finally:
+            self._building = False
+            connection.close()  # this thread's own connection
+
+index = SuggestionIndex()
+
+def suggest(text, limit=SUGGEST_LIMIT):
+    return index.search(text, min(limit, MAX_LIMIT))
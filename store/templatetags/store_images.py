@@ -0,0 +1,38 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from store.images import SIZES
+
+register = template.Library()
+
+# Variant -> value of the <img sizes> attribute for where it is displayed.
+DISPLAY_SIZES = {
+    'thumb': '80px',
+    'card': '(max-width: 600px) 50vw, 220px',
+    'detail': '(max-width: 800px) 100vw, 540px',
+}
+
+def _srcset(variants, ext):
+    return ', '.join(
+        f"{default_storage.url(variants[v][ext])} {variants[v]['width']}w"
+        for v in SIZES if v in variants and variants[v].get(ext)
+    )
+
+@register.simple_tag
+def medicine_picture(medicine, variant='card', alt=''):
+    """<picture> with WebP and JPEG srcsets, falling back to the original upload."""
+    variants = medicine.image_variants or {}
+    # The detail image is above the fold; lazy-loading it would delay first render.
+    loading = 'eager' if variant == 'detail' else 'lazy'
+    if variant not in variants:
+        return format_html('<img src="{}" alt="{}" loading="{}">', medicine.image.url, alt, loading)
+    entry = variants[variant]
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" loading="{}" decoding="async">'
+        '</picture>',
+        _srcset(variants, 'webp'), DISPLAY_SIZES[variant],
+        default_storage.url(entry['jpg']), _srcset(variants, 'jpg'), DISPLAY_SIZES[variant],
+        entry['width'], entry['height'], alt, loading,
+    )
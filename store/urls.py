@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.home, name='home'),
@@ -9,12 +9,19 @@ urlpatterns = [
     path('category/<slug:slug>/', views.product_list, name='product_list_by_category'),
     path('products/', views.product_list, name='product_list'),
     path('product/<slug:slug>/', views.product_detail, name='product_detail'),
+    path('search/suggest/', views.search_suggest, name='search_suggest'),
+
+    # JSON catalog API (async views)
+    path('api/products/', api.products, name='api_products'),
+    path('api/products/<slug:slug>/', api.product, name='api_product'),
+    path('api/search/', api.product_search, name='api_search'),
 
     # Cart
     path('cart/', views.cart_view, name='cart'),
     path('cart/add/<int:medicine_id>/', views.add_to_cart, name='add_to_cart'),
-    path('cart/update/<int:item_id>/', views.update_cart_item, name='update_cart_item'),
-    path('cart/remove/<int:item_id>/', views.remove_cart_item, name='remove_cart_item'),
+    path('cart/update/<int:medicine_id>/', views.update_cart_item, name='update_cart_item'),
+    path('cart/remove/<int:medicine_id>/', views.remove_cart_item, name='remove_cart_item'),
+    path('cart/batch/', views.cart_batch, name='cart_batch'),
 
     # Checkout & Orders
     path('checkout/', views.checkout, name='checkout'),
@@ -28,11 +35,17 @@ urlpatterns = [
 
     # Admin (custom lightweight dashboard)
     path('dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('dashboard/stock/', views.admin_stock_report, name='admin_stock_report'),
     path('dashboard/medicines/', views.admin_medicine_list, name='admin_medicine_list'),
     path('dashboard/medicines/add/', views.admin_medicine_create, name='admin_medicine_create'),
     path('dashboard/medicines/<int:pk>/edit/', views.admin_medicine_update, name='admin_medicine_update'),
     path('dashboard/medicines/<int:pk>/delete/', views.admin_medicine_delete, name='admin_medicine_delete'),
 
     path('dashboard/orders/', views.admin_orders, name='admin_orders'),
+    path('dashboard/orders/export/', views.admin_orders_export, name='admin_orders_export'),
+    path('dashboard/orders/bulk-status/', views.admin_orders_bulk_status, name='admin_orders_bulk_status'),
     path('dashboard/orders/<int:pk>/status/', views.admin_order_status, name='admin_order_status'),
+
+    path('dashboard/metrics/', views.admin_metrics, name='admin_metrics'),
+    path('dashboard/metrics/prometheus/', views.metrics_prometheus, name='metrics_prometheus'),
 ]
\ No newline at end of file
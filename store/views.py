@@ -1,133 +1,253 @@
+import json
+
 from django.contrib import messages
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.conf import settings
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse,
+)
+from django.views.decorators.http import require_POST
+from django.utils.cache import patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils import timezone
 from django.shortcuts import get_object_or_404, redirect, render
-from django.db.models import Q, F
-from .models import Category, Medicine, Cart, CartItem, Address, Order, OrderItem, Prescription
-from .forms import SignUpForm, AddressForm, MedicineForm, PrescriptionForm
+from django.urls import reverse
+from . import analytics, caching, counters, exports, facets, metrics, pagination, recommendations, search, suggest
+from .conditional import catalog_etag, conditional_page, order_etag, order_last_modified, product_etag, product_stock
+from .cart import EMPTY_SUMMARY, CartStore
+from .pagination import paginate
+from .routers import replica_reads
+from .models import ArchivedOrder, Category, Medicine, Cart, Address, Order
+from .forms import SignUpForm, AddressForm, MedicineForm, OrderBulkStatusForm, OrderExportForm, PrescriptionForm
+from .orders import CheckoutError, place_order, transition_orders
 
 def is_staff(user):
     return user.is_staff
 
 # ---------- Public & User Module ----------
 
+LISTING_PARAMS = ('q', *facets.PARAMS, *pagination.PARAMS)
+
+def _catalog_categories():
+    return caching.cached('categories', lambda: list(Category.objects.all().order_by('name')))
+
+def _search_params(request):
+    return (request.GET.get('q') or '',) if caching.known_params(request, ['q']) else None
+
+def _listing_params(request):
+    if not caching.known_params(request, LISTING_PARAMS):
+        return None
+    return request.GET.get('q') or '', facets.cache_key(facets.parse(request.GET)), pagination.cache_key(request)
+
+@caching.cache_catalog_page(_search_params)
+@replica_reads
 def home(request):
-    categories = Category.objects.all().order_by('name')
-    medicines = Medicine.objects.order_by('-created_at')[:8]
+    categories = _catalog_categories()
     q = request.GET.get('q')
     if q:
-        medicines = Medicine.objects.filter(
-            Q(name__icontains=q) | Q(brand__icontains=q) | Q(description__icontains=q)
-        )
+        medicines = caching.cached(('search', q), lambda: search.search_medicines(q))
+    else:
+        medicines = caching.cached('latest', lambda: list(Medicine.objects.order_by('-created_at')[:8]))
     return render(request, 'store/home.html', {'categories': categories, 'medicines': medicines})
 
+@conditional_page(etag_func=catalog_etag)
+@caching.cache_catalog_page(_listing_params)
+@replica_reads
 def product_list(request, slug=None):
     category = None
-    categories = Category.objects.all().order_by('name')
-    medicines = Medicine.objects.all()
+    categories = _catalog_categories()
     q = request.GET.get('q')
     if slug:
-        category = get_object_or_404(Category, slug=slug)
-        medicines = medicines.filter(category=category)
-    if q:
-        medicines = medicines.filter(Q(name__icontains=q) | Q(brand__icontains=q) | Q(description__icontains=q))
-    return render(request, 'store/product_list.html', {'categories': categories, 'category': category, 'medicines': medicines})
+        category = caching.cached(('category', slug), lambda: Category.objects.filter(slug=slug).first())
+        if category is None:
+            raise Http404("No Category matches the given query.")
+
+    selected = facets.parse(request.GET)
+
+    def load():
+        medicines = Medicine.objects.all()
+        if category:
+            medicines = medicines.filter(category=category)
+        if q:
+            ranked = search.ranked_ids(q, medicines)
+            medicines = medicines.filter(pk__in=ranked)
+        counts = facets.facet_counts(medicines, selected)
+        medicines = facets.apply(medicines, selected)
+        if q:
+            found = medicines.in_bulk(ranked)
+            return [found[pk] for pk in ranked if pk in found], None, counts
+        page = paginate(request, medicines)
+        return page.object_list, page, counts
+
+    params = _listing_params(request)
+    if params is None:
+        medicines, page, facet_counts = load()
+    else:
+        medicines, page, facet_counts = caching.cached(('products', slug, params), load)
+    return render(request, 'store/product_list.html', {
+        'categories': categories, 'category': category, 'medicines': medicines, 'page': page,
+        'facets': facet_counts, 'q': q or '',
+    })
 
+# Not whole-page cached: the page shows availability, which every cart hold changes.
+@conditional_page(etag_func=product_etag)
+@replica_reads
 def product_detail(request, slug):
-    product = get_object_or_404(Medicine, slug=slug)
-    return render(request, 'store/product_detail.html', {'product': product})
+    product = caching.cached(('product', slug), lambda: Medicine.objects.select_related('category').filter(slug=slug).first())
+    stock = product_stock(request, slug)
+    if product is None or stock is None:
+        raise Http404("No Medicine matches the given query.")
+    product.stock, product.reserved = stock
+    return render(request, 'store/product_detail.html', {
+        'product': product, 'bought_together': recommendations.bought_together(product.pk),
+    })
 
-def _get_or_create_cart(user):
-    cart, _ = Cart.objects.get_or_create(user=user)
-    return cart
+@replica_reads
+def search_suggest(request):
+    q = request.GET.get('q', '')[:100]
+    response = JsonResponse({
+        'q': q,
+        'suggestions': [{'kind': s.kind, 'label': s.label, 'url': s.url} for s in suggest.suggest(q)],
+    })
+    # The same for every visitor, so browsers and proxies may reuse it briefly.
+    patch_cache_control(response, public=True, max_age=60)
+    return response
 
-@login_required
+def _cart_json(store, unavailable=()):
+    summary = store.summary()
+    return JsonResponse({
+        'lines': {str(pk): qty for pk, qty in store.lines.items()},
+        'unavailable': sorted(unavailable),
+        'item_count': summary.item_count,
+        'amount': str(summary.amount),
+        'need_rx': summary.need_rx,
+    })
+
+@require_POST
 def add_to_cart(request, medicine_id):
-    medicine = get_object_or_404(Medicine, id=medicine_id)
-    cart = _get_or_create_cart(request.user)
-    item, created = CartItem.objects.get_or_create(cart=cart, medicine=medicine)
-    if not created:
-        item.quantity = F('quantity') + 1
-        item.save()
-        item.refresh_from_db()
-    messages.success(request, f"Added {medicine.name} to cart.")
+    medicine = get_object_or_404(Medicine.objects.only('id', 'name'), id=medicine_id)
+    if CartStore.for_request(request, create=True).add(medicine.pk):
+        messages.error(request, f"Sorry, no more {medicine.name} is available right now.")
+    else:
+        messages.success(request, f"Added {medicine.name} to cart.")
     return redirect('cart')
 
-@login_required
 def cart_view(request):
-    cart = _get_or_create_cart(request.user)
-    items = cart.items.select_related('medicine')
-    need_rx = any(i.medicine.rx_required for i in items)
-    return render(request, 'store/cart.html', {'cart': cart, 'items': items, 'need_rx': need_rx})
+    store = CartStore.for_request(request)
+    items = store.items() if store is not None else []
+    summary = store.summary() if store is not None else EMPTY_SUMMARY
+    return render(request, 'store/cart.html', {'items': items, 'summary': summary, 'need_rx': summary.need_rx})
 
-@login_required
-def update_cart_item(request, item_id):
-    item = get_object_or_404(CartItem, id=item_id, cart__user=request.user)
-    qty = int(request.POST.get('quantity', 1))
-    if qty <= 0:
-        item.delete()
-    else:
-        item.quantity = qty
-        item.save()
+@require_POST
+def update_cart_item(request, medicine_id):
+    store = CartStore.for_request(request)
+    if store is not None:
+        try:
+            if store.set(medicine_id, int(request.POST.get('quantity', 1))):
+                messages.error(request, "Not enough stock for that quantity.")
+        except ValueError:
+            messages.error(request, "Quantity must be a whole number.")
     return redirect('cart')
 
-@login_required
-def remove_cart_item(request, item_id):
-    item = get_object_or_404(CartItem, id=item_id, cart__user=request.user)
-    item.delete()
+@require_POST
+def remove_cart_item(request, medicine_id):
+    store = CartStore.for_request(request)
+    if store is not None:
+        store.remove(medicine_id)
+    return redirect('cart')
+
+def _parse_cart_batch(request):
+    """(quantities, deltas, replace) from a JSON body or the cart page form."""
+    if request.content_type == 'application/json':
+        payload = json.loads(request.body)
+        quantities, deltas = {}, {}
+        for line in payload.get('lines', []):
+            medicine_id = int(line['medicine'])
+            if 'quantity' in line:
+                quantities[medicine_id] = int(line['quantity'])
+            else:
+                deltas[medicine_id] = int(line.get('delta', 1))
+        return quantities, deltas, bool(payload.get('replace'))
+    quantities = {
+        int(key[len('qty_'):]): int(value or 0)
+        for key, value in request.POST.items() if key.startswith('qty_')
+    }
+    return quantities, {}, False
+
+@require_POST
+def cart_batch(request):
+    """Change several cart lines in one request: {"lines": [{"medicine": 3, "quantity": 2}, {"medicine": 5, "delta": 1}]}."""
+    as_json = request.content_type == 'application/json'
+    try:
+        quantities, deltas, replace = _parse_cart_batch(request)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        if as_json:
+            return JsonResponse({'error': 'Invalid cart update.'}, status=400)
+        messages.error(request, "Quantities must be whole numbers.")
+        return redirect('cart')
+    if any(q < 0 for q in quantities.values()):
+        return JsonResponse({'error': 'Quantities cannot be negative.'}, status=400) if as_json else redirect('cart')
+
+    wanted = set(quantities) | set(deltas)
+    known = set(Medicine.objects.filter(pk__in=wanted).values_list('pk', flat=True)) if wanted else set()
+    if wanted - known:
+        if as_json:
+            return JsonResponse({'error': 'Unknown medicine.', 'medicines': sorted(wanted - known)}, status=400)
+        quantities = {pk: q for pk, q in quantities.items() if pk in known}
+    store = CartStore.for_request(request, create=True)
+    unavailable = store.update(quantities, deltas, replace)
+    if as_json:
+        return _cart_json(store, unavailable)
+    if unavailable:
+        messages.error(request, "Some quantities could not be reserved and were left unchanged.")
     return redirect('cart')
 
 @login_required
 def checkout(request):
-    cart = _get_or_create_cart(request.user)
-    items = cart.items.select_related('medicine')
-    if not items.exists():
+    store = CartStore.for_request(request)
+    summary = store.summary()
+    if not summary.item_count:
         messages.warning(request, "Your cart is empty.")
         return redirect('product_list')
 
-    need_rx = any(i.medicine.rx_required for i in items)
+    need_rx = summary.need_rx
 
     if request.method == 'POST':
         address_id = request.POST.get('address_id')
         address = get_object_or_404(Address, id=address_id, user=request.user)
 
-        # Fake payment -> COD / simulate success
-        order = Order.objects.create(user=request.user, address=address, payment_status='cod', order_status='placed')
-        total = 0
-        for i in items:
-            price = i.medicine.price
-            OrderItem.objects.create(order=order, medicine=i.medicine, quantity=i.quantity, price=price)
-            i.medicine.stock = max(0, i.medicine.stock - i.quantity)
-            i.medicine.save()
-            total += float(price) * i.quantity
-        order.total_amount = total
-        order.save()
-
-        # Handle prescription upload if required
+        # Attach the prescription only if one was uploaded and is valid
+        prescription = None
         if need_rx and request.FILES.get('file'):
             form = PrescriptionForm(request.POST, request.FILES)
             if form.is_valid():
-                pres = form.save(commit=False)
-                pres.user = request.user
-                pres.order = order
-                pres.save()
-        # Clear cart
-        cart.items.all().delete()
+                prescription = form.save(commit=False)
+
+        # Fake payment -> COD / simulate success
+        # Order straight from the cached lines; writing them through first would only be deleted again.
+        try:
+            order = place_order(request.user, address, prescription, quantities=store.lines)
+        except CheckoutError as exc:
+            messages.error(request, str(exc))
+            return redirect('cart')
+        store.clear()
         return redirect('order_success', order_id=order.id)
 
     addresses = request.user.addresses.all().order_by('-is_default', '-created_at')
     pres_form = PrescriptionForm()
-    return render(request, 'store/checkout.html', {'cart': cart, 'items': items, 'addresses': addresses, 'need_rx': need_rx, 'pres_form': pres_form})
+    return render(request, 'store/checkout.html', {'summary': summary, 'addresses': addresses, 'need_rx': need_rx, 'pres_form': pres_form})
 
 @login_required
+@conditional_page(etag_func=order_etag, last_modified_func=order_last_modified)
 def order_success(request, order_id):
     order = get_object_or_404(Order, id=order_id, user=request.user)
     return render(request, 'store/order_success.html', {'order': order})
 
 @login_required
 def my_orders(request):
-    orders = Order.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, 'store/orders.html', {'orders': orders})
+    page = paginate(request, [Order.objects.filter(user=request.user), ArchivedOrder.objects.filter(user=request.user)])
+    return render(request, 'store/orders.html', {'orders': page.object_list, 'page': page})
 
 @login_required
 def profile(request):
@@ -171,22 +291,34 @@ def signup_view(request):
 # ---------- Admin Module (Custom) ----------
 
 @user_passes_test(is_staff)
+@replica_reads
 def admin_dashboard(request):
-    stats = {
-        'users': request.user.__class__.objects.count(),
-        'products': Medicine.objects.count(),
-        'orders': Order.objects.count(),
-        'pending_orders': Order.objects.filter(order_status='placed').count()
-    }
+    stats = counters.dashboard_stats()
+    stats['daily_revenue'] = counters.daily_revenue()
     return render(request, 'store/admin_dashboard.html', stats)
 
+STOCK_REPORT_DAYS = (7, 30, 90)
+
+@user_passes_test(is_staff)
+@replica_reads
+def admin_stock_report(request):
+    days = request.GET.get('days', '')
+    days = int(days) if days.isdigit() and int(days) in STOCK_REPORT_DAYS else analytics.REPORT_DAYS
+    report = analytics.stock_report(days)
+    report['day_choices'] = STOCK_REPORT_DAYS
+    return render(request, 'store/admin_stock_report.html', report)
+
 @user_passes_test(is_staff)
 def admin_medicine_list(request):
     q = request.GET.get('q')
-    meds = Medicine.objects.all().order_by('-created_at')
+    meds = Medicine.objects.all()
+    page = None
     if q:
-        meds = meds.filter(Q(name__icontains=q) | Q(brand__icontains=q))
-    return render(request, 'store/admin_medicine_list.html', {'medicines': meds})
+        meds = search.search_medicines(q, meds)
+    else:
+        page = paginate(request, meds)
+        meds = page.object_list
+    return render(request, 'store/admin_medicine_list.html', {'medicines': meds, 'page': page})
 
 @user_passes_test(is_staff)
 def admin_medicine_create(request):
@@ -222,15 +354,106 @@ def admin_medicine_delete(request, pk):
 
 @user_passes_test(is_staff)
 def admin_orders(request):
-    orders = Order.objects.select_related('user').order_by('-created_at')
-    return render(request, 'store/admin_orders.html', {'orders': orders})
+    orders = Order.objects.select_related('user')
+    archived = ArchivedOrder.objects.select_related('user')  # read-only: delivered or cancelled
+    status_filter = request.GET.get('status', '')
+    if status_filter in dict(Order.ORDER_STATUS_CHOICES):
+        orders = orders.filter(order_status=status_filter)
+        archived = archived.filter(order_status=status_filter)
+    else:
+        status_filter = ''
+    page = paginate(request, [orders, archived])
+    export_form = OrderExportForm()
+    bulk_form = OrderBulkStatusForm(initial={'status_filter': status_filter})
+    return render(request, 'store/admin_orders.html', {
+        'orders': page.object_list, 'page': page, 'export_form': export_form, 'bulk_form': bulk_form,
+        'status_filter': status_filter, 'status_choices': Order.ORDER_STATUS_CHOICES,
+    })
+
+def _transition_message(request, moved, status, requested):
+    label = dict(Order.ORDER_STATUS_CHOICES)[status]
+    done = sum(moved.values())
+    if done:
+        messages.success(request, f"Moved {done} order(s) to {label}.")
+    if requested is not None and done < requested:
+        messages.warning(request, f"{requested - done} order(s) cannot move to {label} from their current status.")
+    elif requested is None and not done:
+        messages.warning(request, f"No matching orders can move to {label}.")
+
+@user_passes_test(is_staff)
+@require_POST
+def admin_orders_bulk_status(request):
+    form = OrderBulkStatusForm(request.POST)
+    if not form.is_valid():
+        messages.error(request, "Choose a status and which orders to update.")
+        return redirect('admin_orders')
+    status = form.cleaned_data['order_status']
+    status_filter = form.cleaned_data['status_filter']
+    if form.cleaned_data['scope'] == 'filtered':
+        orders = Order.objects.filter(order_status=status_filter) if status_filter else Order.objects.all()
+        requested = None
+    else:
+        ids = {int(v) for v in request.POST.getlist('orders') if v.isdigit()}
+        if not ids:
+            messages.error(request, "Select at least one order.")
+            return redirect('admin_orders')
+        orders = Order.objects.filter(pk__in=ids)
+        requested = len(ids)
+    moved = transition_orders(orders, status, changed_by=request.user)
+    _transition_message(request, moved, status, requested)
+    url = reverse('admin_orders')
+    return redirect(f'{url}?status={status_filter}' if status_filter else url)
+
+@user_passes_test(is_staff)
+def admin_orders_export(request):
+    form = OrderExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    filters = (form.cleaned_data['date_from'], form.cleaned_data['date_to'], form.cleaned_data['status'])
+    # Delivered and cancelled orders may have been archived; they are exported after the hot ones.
+    lines, archived = exports.order_lines(*filters), exports.archived_orders(*filters)
+    if form.cleaned_data['format'] == 'ndjson':
+        response = StreamingHttpResponse(exports.stream_ndjson(lines, archived), content_type='application/x-ndjson')
+        extension = 'ndjson'
+    else:
+        response = StreamingHttpResponse(exports.stream_csv(lines, archived), content_type='text/csv')
+        extension = 'csv'
+    filename = f"orders-{timezone.localdate():%Y%m%d}.{extension}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 @user_passes_test(is_staff)
+@require_POST
 def admin_order_status(request, pk):
-    order = get_object_or_404(Order, pk=pk)
+    get_object_or_404(Order.objects.only('pk'), pk=pk)
     status = request.POST.get('order_status')
     if status in dict(Order.ORDER_STATUS_CHOICES):
-        order.order_status = status
-        order.save()
-        messages.success(request, "Order status updated.")
-    return redirect('admin_orders')
\ No newline at end of file
+        moved = transition_orders(Order.objects.filter(pk=pk), status, changed_by=request.user)
+        _transition_message(request, moved, status, 1)
+    return redirect('admin_orders')
+
+@user_passes_test(is_staff)
+def admin_metrics(request):
+    rows = [
+        {
+            'view': view,
+            'requests': s.requests,
+            'avg_ms': s.seconds / s.requests * 1000 if s.requests else 0,
+            'p95_ms': s.percentile(95) * 1000,
+            'sampled': s.sampled,
+            'avg_queries': s.queries / s.sampled if s.sampled else None,
+            'avg_sql_ms': s.sql_seconds / s.sampled * 1000 if s.sampled else None,
+            'n_plus_one': s.n_plus_one,
+            'patterns': s.patterns.most_common(metrics.MAX_PATTERNS),
+        }
+        for view, s in metrics.registry.snapshot()
+    ]
+    rows.sort(key=lambda r: r['avg_ms'] * r['requests'], reverse=True)
+    return render(request, 'store/admin_metrics.html', {'rows': rows, 'sample_rate': settings.METRICS_SAMPLE_RATE})
+
+def metrics_prometheus(request):
+    token = settings.METRICS_TOKEN
+    bearer = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not (request.user.is_staff or (token and constant_time_compare(bearer, token))):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.prometheus_text(), content_type='text/plain; version=0.0.4; charset=utf-8')